@@ -2,12 +2,31 @@
 Dépendances FastAPI
 """
 
+import orjson
+from fastapi import Request, Response
+from slowapi.errors import RateLimitExceeded
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import SessionLocal, AsyncSessionLocal
+
+# Réponse 429 pré-sérialisée : rien à calculer quand le limiteur rejette en rafale
+RATE_LIMITED_BODY = orjson.dumps({"error": "rate_limited"})
+RATE_LIMITED_HEADERS = {"Retry-After": "60"}
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> Response:
+    return Response(
+        RATE_LIMITED_BODY,
+        status_code=429,
+        media_type="application/json",
+        headers=RATE_LIMITED_HEADERS
+    )
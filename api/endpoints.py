@@ -2,42 +2,127 @@
 Points de terminaison API
 """
 
-import json
+import hashlib
 import logging
+import os
+import tempfile
+import time
 import uuid
 from datetime import datetime
+from pathlib import Path
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile
-from fastapi.responses import HTMLResponse
+import aiofiles
+import orjson
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
 from slowapi import Limiter
 from slowapi.util import get_remote_address
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
 
-from config import Config
-from database import Transcription, SessionLocal
-from models.schemas import TranscriptionResult
-from api.dependencies import get_db
+from config import load_config
+from database import Transcription, AsyncSessionLocal
+from models.schemas import TranscriptionResult, TranscriptionSummary
+from api.dependencies import get_async_db
 
 # Import depuis le nouveau module transcribe
-from transcribe.transcription import run_transcription_optimized
+from transcribe.transcription import QUEUE_FULL_MESSAGE, enqueue_transcription
 from transcribe.audio_utils import sanitize_filename
 
-config = Config()
+config = load_config()
 logger = logging.getLogger(__name__)
 limiter = Limiter(key_func=get_remote_address)
+# Limite statique : slowapi la parse une seule fois, à la décoration de la route
+UPLOAD_RATE_LIMIT = f"{config.rate_limit}/minute"
 templates = Jinja2Templates(directory=config.templates_dir)
 
+# Templates : bytecode compilé partagé entre workers, pas de rechargement en production
+TEMPLATES_AUTO_RELOAD = os.getenv("TEMPLATES_AUTO_RELOAD", "false").lower() == "true"
+if not TEMPLATES_AUTO_RELOAD:
+    _jinja_cache_dir = Path(tempfile.gettempdir()) / "vocalyx-jinja"
+    _jinja_cache_dir.mkdir(exist_ok=True)
+    templates.env.bytecode_cache = FileSystemBytecodeCache(str(_jinja_cache_dir))
+    templates.env.auto_reload = False
+
 router = APIRouter()
 
+
+# Dashboard : page statique (données chargées côté client par static/js),
+# rendue une seule fois avec un ETag constant
+_dashboard_page: dict = {}
+
+def warm_templates():
+    """Compile les templates HTML au démarrage (première requête déjà chaude)"""
+    for name in templates.env.list_templates(filter_func=lambda n: n.endswith(".html")):
+        templates.env.get_template(name)
+    
+    body = templates.get_template("dashboard.html").render().encode()
+    _dashboard_page["body"] = body
+    _dashboard_page["etag"] = '"' + hashlib.md5(body).hexdigest() + '"'
+
+# Taille des blocs lus depuis l'upload (1 MiB)
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Types MIME acceptés pour un upload audio (les navigateurs envoient parfois video/webm)
+ALLOWED_CONTENT_TYPE_PREFIXES = ("audio/", "video/", "application/octet-stream")
+
+# Aperçu du texte dans les listes (+1 caractère pour signaler la troncature)
+TEXT_PREVIEW_CHARS = 100
+
+# Colonnes chargées pour les listes (ni segments ni texte complet)
+SUMMARY_COLUMNS = (
+    Transcription.id,
+    Transcription.status,
+    Transcription.language,
+    Transcription.processing_time,
+    Transcription.duration,
+    func.substr(Transcription.text, 1, TEXT_PREVIEW_CHARS + 1).label("text"),
+    Transcription.error_message,
+    Transcription.segments_count,
+    Transcription.vad_enabled,
+    Transcription.created_at,
+    Transcription.finished_at,
+)
+
+# Cache du comptage par statut (invalidé à chaque création/suppression)
+COUNT_CACHE_TTL = 2.0
+_count_cache: dict = {}
+
+# Cache des sondes /health (absorbe les rafales de probes)
+HEALTH_CACHE_TTL = 0.5
+_health_cache: dict = {}
+
+def _serialize(entry, include_segments: bool = True) -> dict:
+    """Convertit une transcription (ORM ou ligne de colonnes) en dictionnaire de réponse"""
+    result = {
+        "id": entry.id,
+        "status": entry.status,
+        "language": entry.language,
+        "processing_time": float(entry.processing_time) if entry.processing_time else None,
+        "duration": float(entry.duration) if entry.duration else None,
+        "text": entry.text,
+        "error_message": entry.error_message,
+        "segments_count": entry.segments_count,
+        "vad_enabled": bool(entry.vad_enabled),
+        "created_at": entry.created_at.isoformat() if entry.created_at else None,
+        "finished_at": entry.finished_at.isoformat() if entry.finished_at else None,
+    }
+    if include_segments:
+        result["segments"] = entry.segments or []
+    return result
+
 @router.post("/transcribe", summary="Créer une transcription", tags=["Transcriptions"])
-@limiter.limit(f"{config.rate_limit}/minute")
+@limiter.limit(UPLOAD_RATE_LIMIT)
 async def create_transcription(
     request: Request,
     file: UploadFile = File(...),
     translate: Optional[bool] = False,
-    use_vad: Optional[bool] = True
+    use_vad: Optional[bool] = True,
+    db: AsyncSession = Depends(get_async_db)
 ):
     from transcribe.transcription import whisper_model
     
@@ -49,137 +134,188 @@ async def create_transcription(
     
     if ext not in config.allowed_extensions:
         raise HTTPException(400, f"Unsupported: {ext}")
-
-    content = await file.read()
-    file_size_mb = len(content) / (1024 * 1024)
     
-    if file_size_mb > config.max_file_size_mb:
-        raise HTTPException(413, f"File too large: {file_size_mb:.2f}MB")
+    content_type = file.content_type or ""
+    if content_type and not content_type.startswith(ALLOWED_CONTENT_TYPE_PREFIXES):
+        raise HTTPException(400, f"Unsupported content type: {content_type}")
 
     transcription_id = str(uuid.uuid4())
     tmp_path = config.upload_dir / f"{transcription_id}_{filename}"
     
-    with open(tmp_path, "wb") as fh:
-        fh.write(content)
+    # Écriture en streaming par blocs de 1 MiB (pas de copie complète en mémoire)
+    total = 0
+    digest = hashlib.sha256()
+    try:
+        async with aiofiles.open(tmp_path, "wb") as fh:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                total += len(chunk)
+                if total > config.max_file_size_bytes:
+                    break
+                digest.update(chunk)
+                await fh.write(chunk)
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        await file.close()
+    
+    if total > config.max_file_size_bytes:
+        tmp_path.unlink(missing_ok=True)
+        raise HTTPException(413, f"File too large: > {config.max_file_size_mb}MB")
+    
+    file_size_mb = total / (1024 * 1024)
+    
+    # Les options changent le résultat : elles font partie de la clé
+    digest.update(f"|translate={bool(translate)}|vad={bool(use_vad)}".encode())
+    content_hash = digest.hexdigest()
+    
+    existing_id = await db.scalar(
+        select(Transcription.id)
+        .where(Transcription.content_hash == content_hash, Transcription.status == "done")
+        .limit(1)
+    )
+    if existing_id:
+        tmp_path.unlink(missing_ok=True)
+        logger.info(f"[{existing_id}] ♻️ Duplicate upload {filename} ({file_size_mb:.2f}MB), reusing result")
+        return {"transcription_id": existing_id, "status": "done", "duplicate_of": existing_id}
 
-    db = SessionLocal()
     db.add(Transcription(
         id=transcription_id,
         status="pending",
         vad_enabled=1 if use_vad else 0,
         enrichment_requested=1,  # Par défaut, on enrichit
+        content_hash=content_hash,
         created_at=datetime.utcnow()
     ))
-    db.commit()
-    db.close()
+    await db.commit()
+    _count_cache.clear()
 
     logger.info(f"[{transcription_id}] 📥 {filename} ({file_size_mb:.2f}MB) | VAD: {use_vad}")
     
-    import asyncio
-    asyncio.create_task(run_transcription_optimized(transcription_id, tmp_path, translate, use_vad))
+    # File remplie entre le contrôle du middleware et maintenant : pas d'attente
+    if not enqueue_transcription(transcription_id, tmp_path, translate, use_vad):
+        await db.execute(delete(Transcription).where(Transcription.id == transcription_id))
+        await db.commit()
+        _count_cache.clear()
+        tmp_path.unlink(missing_ok=True)
+        logger.warning(f"[{transcription_id}] ⏳ Queue full, upload rejected")
+        raise HTTPException(429, QUEUE_FULL_MESSAGE)
 
     return {"transcription_id": transcription_id, "status": "pending"}
 
 @router.get("/transcribe/count", tags=["Transcriptions"])
-def get_transcription_count(db: Session = Depends(get_db)):
+async def get_transcription_count(db: AsyncSession = Depends(get_async_db)):
     """
     Retourne le nombre total de transcriptions et leur répartition par statut.
+    Résultat mis en cache quelques secondes (polling du dashboard).
     """
-    from sqlalchemy import func
+    cached = _count_cache.get("value")
+    if cached is not None and time.monotonic() < _count_cache["expires"]:
+        return cached
     
-    counts = (
-        db.query(Transcription.status, func.count(Transcription.id))
+    counts = (await db.execute(
+        select(Transcription.status, func.count(Transcription.id))
         .group_by(Transcription.status)
-        .all()
-    )
+    )).all()
 
     result = {"total": 0, "pending": 0, "processing": 0, "done": 0, "error": 0}
     for status, count in counts:
         result[status] = count
         result["total"] += count
 
+    _count_cache["value"] = result
+    _count_cache["expires"] = time.monotonic() + COUNT_CACHE_TTL
     return result
 
-@router.get("/transcribe/recent", response_model=List[TranscriptionResult], tags=["Transcriptions"])
-def get_recent_transcriptions(limit: int = Query(10, ge=1, le=100), db: Session = Depends(get_db)):
-    entries = db.query(Transcription).order_by(Transcription.created_at.desc()).limit(limit).all()
-    
-    results = []
-    for entry in entries:
-        segments = json.loads(entry.segments) if entry.segments else []
-        results.append({
-            "id": entry.id,
-            "status": entry.status,
-            "language": entry.language,
-            "processing_time": float(entry.processing_time) if entry.processing_time else None,
-            "duration": float(entry.duration) if entry.duration else None,
-            "text": entry.text,
-            "segments": segments,
-            "error_message": entry.error_message,
-            "segments_count": entry.segments_count,
-            "vad_enabled": bool(entry.vad_enabled),
-            "created_at": entry.created_at.isoformat() if entry.created_at else None,
-            "finished_at": entry.finished_at.isoformat() if entry.finished_at else None,
-        })
-    return results
+def latest_first(stmt, after: Optional[datetime] = None):
+    """
+    Trie du plus récent au plus ancien (index sur created_at).
+    Pagination par curseur : `after` = created_at du dernier élément reçu.
+    """
+    if after is not None:
+        stmt = stmt.where(Transcription.created_at < after)
+    return stmt.order_by(Transcription.created_at.desc(), Transcription.id.desc())
+
+async def _stream_recent_ndjson(limit: int, after: Optional[datetime] = None):
+    """Génère les transcriptions récentes ligne par ligne (NDJSON)"""
+    async with AsyncSessionLocal() as db:
+        rows = await db.stream(
+            latest_first(select(*SUMMARY_COLUMNS), after)
+            .limit(limit)
+            .execution_options(yield_per=50)
+        )
+        async for row in rows:
+            yield orjson.dumps(_serialize(row, include_segments=False)) + b"\n"
+
+@router.get("/transcribe/recent", response_model=List[TranscriptionSummary], tags=["Transcriptions"])
+async def get_recent_transcriptions(
+    request: Request,
+    limit: int = Query(10, ge=1, le=100),
+    after: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    if "application/x-ndjson" in request.headers.get("accept", ""):
+        return StreamingResponse(_stream_recent_ndjson(limit, after), media_type="application/x-ndjson")
+    
+    entries = (await db.execute(
+        latest_first(select(*SUMMARY_COLUMNS), after).limit(limit)
+    )).all()
+    
+    return [_serialize(entry, include_segments=False) for entry in entries]
 
 @router.get("/transcribe/{transcription_id}", response_model=TranscriptionResult, tags=["Transcriptions"])
-def get_transcription(transcription_id: str, db: Session = Depends(get_db)):
-    entry = db.query(Transcription).filter(Transcription.id == transcription_id).first()
+async def get_transcription(
+    transcription_id: str,
+    response: Response,
+    include_segments: bool = Query(True, description="false : segments ni chargés ni décodés (polling)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    stmt = select(Transcription).where(Transcription.id == transcription_id)
+    if include_segments:
+        stmt = stmt.options(undefer(Transcription.segments))
+    entry = await db.scalar(stmt)
     if not entry:
         raise HTTPException(404, "Not found")
     
-    segments = json.loads(entry.segments) if entry.segments else []
-    return {
-        "id": entry.id,
-        "status": entry.status,
-        "language": entry.language,
-        "processing_time": float(entry.processing_time) if entry.processing_time else None,
-        "duration": float(entry.duration) if entry.duration else None,
-        "text": entry.text,
-        "segments": segments,
-        "error_message": entry.error_message,
-        "segments_count": entry.segments_count,
-        "vad_enabled": bool(entry.vad_enabled),
-        "created_at": entry.created_at.isoformat() if entry.created_at else None,
-        "finished_at": entry.finished_at.isoformat() if entry.finished_at else None,
-    }
+    # Une transcription terminée ne change plus
+    if entry.status == "done":
+        response.headers["Cache-Control"] = "public, max-age=300"
+    
+    return _serialize(entry, include_segments=include_segments)
 
 @router.delete("/transcribe/{transcription_id}", tags=["Transcriptions"])
-def delete_transcription(transcription_id: str, db: Session = Depends(get_db)):
-    entry = db.query(Transcription).filter(Transcription.id == transcription_id).first()
+async def delete_transcription(transcription_id: str, db: AsyncSession = Depends(get_async_db)):
+    entry = await db.get(Transcription, transcription_id)
     if not entry:
         raise HTTPException(404, "Not found")
-    db.delete(entry)
-    db.commit()
+    await db.delete(entry)
+    await db.commit()
+    _count_cache.clear()
     return {"status": "deleted", "id": transcription_id}
 
+def render_dashboard(request: Request) -> Response:
+    """
+    Dashboard avec ETag : le HTML ne contient pas de données (chargées côté
+    client), seul un changement du template le modifie.
+    """
+    if not _dashboard_page or TEMPLATES_AUTO_RELOAD:
+        warm_templates()
+    etag = _dashboard_page["etag"]
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    return HTMLResponse(_dashboard_page["body"], headers={"ETag": etag})
+
 @router.get("/dashboard", response_class=HTMLResponse, tags=["Dashboard"])
-def dashboard(request: Request, limit: int = 10, db: Session = Depends(get_db)):
-    entries = db.query(Transcription).order_by(Transcription.created_at.desc()).limit(limit).all()
-    return templates.TemplateResponse("dashboard.html", {"request": request, "entries": entries})
+async def dashboard(request: Request):
+    return render_dashboard(request)
 
 @router.get("/config", tags=["System"])
-def get_config():
+async def get_config():
     """Retourne la configuration actuelle (sans données sensibles)"""
-    return {
-        "whisper": {
-            "model": config.model,
-            "device": config.device,
-            "compute_type": config.compute_type,
-            "language": config.language,
-        },
-        "performance": {
-            "max_workers": config.max_workers,
-            "segment_length_ms": config.segment_length_ms,
-            "vad_enabled": config.vad_enabled,
-        },
-        "limits": {
-            "max_file_size_mb": config.max_file_size_mb,
-            "rate_limit_per_minute": config.rate_limit,
-            "allowed_extensions": list(config.allowed_extensions),
-        }
-    }
+    load_config()  # Recharge l'instance partagée si config.ini a changé (mtime)
+    return Response(config.public_json, media_type="application/json")
 
 @router.post("/config/reload", tags=["System"])
 def reload_config():
@@ -194,9 +330,19 @@ def reload_config():
 def health_check():
     from transcribe.transcription import whisper_model
     
-    return {
-        "status": "healthy" if whisper_model else "starting",
-        "model_loaded": whisper_model is not None,
+    model_loaded = whisper_model is not None
+    cached = _health_cache.get(model_loaded)
+    if cached is not None and time.monotonic() < cached[0]:
+        return cached[1]
+    
+    # Sondes périodiques : prise en compte d'un config.ini modifié (mtime)
+    load_config()
+    payload = {
+        "status": "healthy" if model_loaded else "starting",
+        "model_loaded": model_loaded,
         "timestamp": datetime.utcnow().isoformat(),
         "config_file": "config.ini"
-    }
\ No newline at end of file
+    }
+    _health_cache.clear()
+    _health_cache[model_loaded] = (time.monotonic() + HEALTH_CACHE_TTL, payload)
+    return payload
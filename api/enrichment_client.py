@@ -4,8 +4,10 @@ Utilisé par le service de transcription
 """
 
 import os
+import time
+import asyncio
 import logging
-import requests
+import httpx
 from typing import Optional, Dict, Any
 from datetime import datetime
 
@@ -32,20 +34,47 @@ class EnrichmentClient:
         
         self.timeout = int(os.getenv("ENRICHMENT_TIMEOUT", "30"))
         
+        # Client HTTP partagé (keep-alive + pool de connexions)
+        # Les erreurs de connexion sont réessayées par le transport
+        limits = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self.timeout,
+            transport=httpx.AsyncHTTPTransport(limits=limits, retries=2)
+        )
+        
+        # Cache du health check (évite une sonde HTTP par déclenchement)
+        self.health_ttl = float(os.getenv("ENRICHMENT_HEALTH_TTL", "10"))
+        self._health_checked_at = 0.0
+        self._health_result = False
+        self._health_lock = asyncio.Lock()
+        
         logger.info(f"EnrichmentClient initialized: {self.base_url}")
     
-    def is_available(self) -> bool:
+    async def is_available(self) -> bool:
         """
         Vérifie si le service d'enrichissement est disponible.
+        Le résultat est mis en cache pendant `health_ttl` secondes.
         
         Returns:
             True si le service répond, False sinon
         """
+        if time.monotonic() - self._health_checked_at < self.health_ttl:
+            return self._health_result
+        
+        async with self._health_lock:
+            # Un autre appelant a pu rafraîchir le cache pendant l'attente
+            if time.monotonic() - self._health_checked_at < self.health_ttl:
+                return self._health_result
+            
+            self._health_result = await self._check_health()
+            self._health_checked_at = time.monotonic()
+            return self._health_result
+    
+    async def _check_health(self) -> bool:
+        """Interroge /health sur le service d'enrichissement"""
         try:
-            response = requests.get(
-                f"{self.base_url}/health",
-                timeout=5
-            )
+            response = await self._client.get("/health", timeout=5)
             
             if response.status_code == 200:
                 data = response.json()
@@ -61,11 +90,11 @@ class EnrichmentClient:
                 logger.warning(f"Enrichment service returned {response.status_code}")
                 return False
                 
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.warning(f"Enrichment service unavailable: {e}")
             return False
     
-    def trigger_enrichment(
+    async def trigger_enrichment(
         self, 
         transcription_id: str,
         raise_on_error: bool = False
@@ -80,12 +109,12 @@ class EnrichmentClient:
         Returns:
             Dictionnaire avec les infos de l'enrichissement créé, ou None si erreur
         """
-        url = f"{self.base_url}/api/enrichment/trigger/{transcription_id}"
+        url = f"/api/enrichment/trigger/{transcription_id}"
         
         try:
             logger.info(f"[{transcription_id[:8]}] Triggering enrichment...")
             
-            response = requests.post(url, timeout=self.timeout)
+            response = await self._client.post(url)
             
             if response.status_code == 200:
                 data = response.json()
@@ -123,19 +152,19 @@ class EnrichmentClient:
                     raise RuntimeError(f"Enrichment service error: {response.status_code}")
                 return None
         
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             logger.error(f"[{transcription_id[:8]}] Timeout calling enrichment service")
             if raise_on_error:
                 raise
             return None
         
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"[{transcription_id[:8]}] Error calling enrichment service: {e}")
             if raise_on_error:
                 raise
             return None
     
-    def get_enrichment(
+    async def get_enrichment(
         self, 
         transcription_id: str
     ) -> Optional[Dict[str, Any]]:
@@ -148,10 +177,10 @@ class EnrichmentClient:
         Returns:
             Dictionnaire avec l'enrichissement, ou None si non trouvé
         """
-        url = f"{self.base_url}/api/enrichment/{transcription_id}"
+        url = f"/api/enrichment/{transcription_id}"
         
         try:
-            response = requests.get(url, timeout=self.timeout)
+            response = await self._client.get(url)
             
             if response.status_code == 200:
                 return response.json()
@@ -161,11 +190,11 @@ class EnrichmentClient:
                 logger.error(f"Error getting enrichment: {response.status_code}")
                 return None
         
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error calling enrichment service: {e}")
             return None
     
-    def get_combined(
+    async def get_combined(
         self, 
         transcription_id: str
     ) -> Optional[Dict[str, Any]]:
@@ -178,10 +207,10 @@ class EnrichmentClient:
         Returns:
             Dictionnaire avec transcription et enrichissement
         """
-        url = f"{self.base_url}/api/enrichment/combined/{transcription_id}"
+        url = f"/api/enrichment/combined/{transcription_id}"
         
         try:
-            response = requests.get(url, timeout=self.timeout)
+            response = await self._client.get(url)
             
             if response.status_code == 200:
                 return response.json()
@@ -189,21 +218,21 @@ class EnrichmentClient:
                 logger.error(f"Error getting combined: {response.status_code}")
                 return None
         
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error calling enrichment service: {e}")
             return None
     
-    def get_stats(self) -> Optional[Dict[str, Any]]:
+    async def get_stats(self) -> Optional[Dict[str, Any]]:
         """
         Récupère les statistiques du service d'enrichissement.
         
         Returns:
             Dictionnaire avec les stats, ou None si erreur
         """
-        url = f"{self.base_url}/api/enrichment/stats/summary"
+        url = "/api/enrichment/stats/summary"
         
         try:
-            response = requests.get(url, timeout=self.timeout)
+            response = await self._client.get(url)
             
             if response.status_code == 200:
                 return response.json()
@@ -211,9 +240,13 @@ class EnrichmentClient:
                 logger.error(f"Error getting stats: {response.status_code}")
                 return None
         
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error calling enrichment service: {e}")
             return None
+    
+    async def aclose(self):
+        """Ferme le pool de connexions HTTP"""
+        await self._client.aclose()
 
 
 # ========================================
@@ -238,14 +271,23 @@ def get_enrichment_client() -> EnrichmentClient:
     return _enrichment_client
 
 
+async def close_enrichment_client():
+    """Ferme le client partagé (à appeler au shutdown)"""
+    global _enrichment_client
+    
+    if _enrichment_client is not None:
+        await _enrichment_client.aclose()
+        _enrichment_client = None
+
+
 # ========================================
 # Fonctions helper
 # ========================================
 
-def trigger_enrichment_async(transcription_id: str) -> bool:
+async def trigger_enrichment_async(transcription_id: str) -> bool:
     """
     Déclenche un enrichissement de manière asynchrone (fire-and-forget).
-    N'attend pas la réponse, ne lève pas d'erreur.
+    À planifier via asyncio.create_task(), ne lève pas d'erreur.
     
     Args:
         transcription_id: ID de la transcription
@@ -256,17 +298,17 @@ def trigger_enrichment_async(transcription_id: str) -> bool:
     client = get_enrichment_client()
     
     # Vérifier disponibilité
-    if not client.is_available():
+    if not await client.is_available():
         logger.warning("Enrichment service not available, skipping")
         return False
     
     # Déclencher (sans raise_on_error)
-    result = client.trigger_enrichment(transcription_id, raise_on_error=False)
+    result = await client.trigger_enrichment(transcription_id, raise_on_error=False)
     
     return result is not None
 
 
-def check_enrichment_service() -> Dict[str, Any]:
+async def check_enrichment_service() -> Dict[str, Any]:
     """
     Vérifie l'état du service d'enrichissement.
     
@@ -275,7 +317,7 @@ def check_enrichment_service() -> Dict[str, Any]:
     """
     client = get_enrichment_client()
     
-    available = client.is_available()
+    available = await client.is_available()
     
     result = {
         "url": client.base_url,
@@ -284,7 +326,7 @@ def check_enrichment_service() -> Dict[str, Any]:
     }
     
     if available:
-        stats = client.get_stats()
+        stats = await client.get_stats()
         if stats:
             result["stats"] = stats
     
@@ -295,14 +337,9 @@ def check_enrichment_service() -> Dict[str, Any]:
 # Tests
 # ========================================
 
-if __name__ == "__main__":
+async def _run_tests():
     """Script de test du client"""
     
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s"
-    )
-    
     print("\n" + "="*60)
     print("TEST: EnrichmentClient")
     print("="*60 + "\n")
@@ -312,17 +349,18 @@ if __name__ == "__main__":
     
     # Test 1: Disponibilité
     print("1. Test disponibilité...")
-    available = client.is_available()
+    available = await client.is_available()
     print(f"   {'✅' if available else '❌'} Service {'disponible' if available else 'indisponible'}\n")
     
     if not available:
         print("⚠️  Service d'enrichissement non accessible")
         print("   Démarrez-le avec: python app_enrichment.py")
+        await client.aclose()
         exit(1)
     
     # Test 2: Statistiques
     print("2. Test statistiques...")
-    stats = client.get_stats()
+    stats = await client.get_stats()
     if stats:
         print(f"   ✅ Stats récupérées:")
         print(f"      Total: {stats.get('total', 0)}")
@@ -337,10 +375,22 @@ if __name__ == "__main__":
     
     # Test 4: Check service
     print("4. Test check service...")
-    check = check_enrichment_service()
+    check = await check_enrichment_service()
     print(f"   ✅ URL: {check['url']}")
     print(f"   ✅ Disponible: {check['available']}")
     
+    await client.aclose()
+    await close_enrichment_client()
+    
     print("\n" + "="*60)
     print("✅ Tests terminés")
-    print("="*60 + "\n")
\ No newline at end of file
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+    )
+    
+    asyncio.run(_run_tests())
@@ -4,29 +4,80 @@ Endpoints pour déclencher et suivre l'enrichissement
 """
 
 import logging
+from collections import OrderedDict
 from datetime import datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-from database import Transcription, SessionLocal
+from database import Transcription
 from enrichment.models import (
     Enrichment, 
-    create_enrichment,
     get_enrichment_by_transcription_id,
     get_pending_enrichments,
-    get_stats_summary
+    get_pending_enrichments_with_transcriptions,
+    get_stats_summary_cached,
+    invalidate_stats_cache,
+    upsert_enrichment
 )
-from api.dependencies import get_db
+from api.dependencies import get_async_db
 
 logger = logging.getLogger(__name__)
 limiter = Limiter(key_func=get_remote_address)
 
 router = APIRouter(prefix="/enrichment", tags=["Enrichment"])
 
+# Colonnes de la transcription sérialisées par /combined
+COMBINED_TRANSCRIPTION_COLUMNS = (
+    Transcription.id,
+    Transcription.status,
+    Transcription.language,
+    Transcription.duration,
+    Transcription.processing_time,
+    Transcription.text,
+    Transcription.segments_count,
+    Transcription.vad_enabled,
+    Transcription.created_at,
+    Transcription.finished_at,
+)
+
+# Transcription + enrichissement (optionnel) en un seul aller-retour,
+# construit une fois : seul l'ID change d'un appel à l'autre
+COMBINED_STMT = (
+    select(Transcription, Enrichment)
+    .outerjoin(Enrichment, Enrichment.transcription_id == Transcription.id)
+    .where(Transcription.id == bindparam("tid"))
+    .options(load_only(*COMBINED_TRANSCRIPTION_COLUMNS))
+)
+
+# Vérifie qu'une entrée en cache est toujours valide : transcription présente et
+# enrichissement toujours terminé (suppression ou relance depuis un autre processus)
+COMBINED_STILL_DONE_STMT = (
+    select(1)
+    .select_from(Transcription)
+    .join(Enrichment, Enrichment.transcription_id == Transcription.id)
+    .where(Transcription.id == bindparam("tid"), Enrichment.status == "done")
+)
+
+# Cache des réponses /combined déjà sérialisées (lignes terminées uniquement)
+COMBINED_CACHE_MAX_SIZE = 4096
+_combined_cache: "OrderedDict[str, bytes]" = OrderedDict()
+
+
+# Réponses définitives : cacheables par le client et les proxies
+FINAL_CACHE_HEADERS = {"Cache-Control": "public, max-age=300"}
+
+
+def _invalidate_combined_cache(transcription_id: str):
+    """Retire une transcription du cache /combined"""
+    _combined_cache.pop(transcription_id, None)
+
 
 # ========================================
 # Modèles Pydantic pour les réponses
@@ -57,6 +108,20 @@ class EnrichmentResponse(BaseModel):
     started_at: Optional[str] = None
     finished_at: Optional[str] = None
 
+class PendingTranscriptionPayload(BaseModel):
+    """Transcription jointe à un enrichissement en attente"""
+    id: str
+    status: str
+    language: Optional[str] = None
+    duration: Optional[float] = None
+    text: Optional[str] = None
+    segments: Optional[list] = None
+
+class PendingEnrichmentWithTranscription(BaseModel):
+    """Enrichissement en attente + transcription (évite un aller-retour par ligne)"""
+    enrichment: EnrichmentResponse
+    transcription: PendingTranscriptionPayload
+
 class EnrichmentCreateResponse(BaseModel):
     """Réponse de création d'enrichissement"""
     enrichment_id: int
@@ -76,6 +141,29 @@ class EnrichmentStatsResponse(BaseModel):
     avg_sentiment_confidence: Optional[float] = None
 
 
+def _to_enrichment_response(e: Enrichment) -> EnrichmentResponse:
+    """Convertit un enrichissement ORM en réponse API"""
+    return EnrichmentResponse(
+        id=e.id,
+        transcription_id=e.transcription_id,
+        status=e.status,
+        title=e.title,
+        summary=e.summary,
+        bullets=e.bullets,
+        sentiment=e.sentiment,
+        sentiment_confidence=e.sentiment_confidence,
+        topics=e.topics,
+        llm_model=e.llm_model,
+        generation_time=e.generation_time,
+        tokens_generated=e.tokens_generated,
+        retry_count=e.retry_count,
+        last_error=e.last_error,
+        created_at=e.created_at.isoformat() if e.created_at else None,
+        started_at=e.started_at.isoformat() if e.started_at else None,
+        finished_at=e.finished_at.isoformat() if e.finished_at else None
+    )
+
+
 # ========================================
 # Endpoints
 # ========================================
@@ -85,7 +173,7 @@ class EnrichmentStatsResponse(BaseModel):
 async def trigger_enrichment(
     transcription_id: str,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Déclenche l'enrichissement d'une transcription
@@ -95,38 +183,37 @@ async def trigger_enrichment(
     Retourne l'ID et le statut de l'enrichissement créé
     """
     
-    # 1. Vérifier que la transcription existe
-    transcription = db.query(Transcription).filter(
-        Transcription.id == transcription_id
-    ).first()
+    # 1. Vérifier que la transcription existe et est terminée (statut seul)
+    transcription_status = await db.scalar(
+        select(Transcription.status).where(Transcription.id == transcription_id)
+    )
     
-    if not transcription:
+    if transcription_status is None:
         raise HTTPException(
             status_code=404,
             detail=f"Transcription not found: {transcription_id}"
         )
     
-    # 2. Vérifier que la transcription est terminée
-    if transcription.status != "done":
+    if transcription_status != "done":
         raise HTTPException(
             status_code=400,
-            detail=f"Transcription must be 'done' (current: {transcription.status})"
+            detail=f"Transcription must be 'done' (current: {transcription_status})"
         )
     
-    # 3. Vérifier qu'il n'y a pas déjà un enrichissement en cours ou terminé
-    existing = get_enrichment_by_transcription_id(db, transcription_id)
+    # 2. Créer l'enrichissement ou relancer celui en erreur (une seule requête)
+    try:
+        row = await db.run_sync(upsert_enrichment, transcription_id)
+    except Exception as e:
+        logger.error(f"[{transcription_id[:8]}] ❌ Erreur création enrichissement: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to create enrichment"
+        )
     
-    if existing:
-        # Si déjà en pending/processing, retourner l'existant
-        if existing.status in ["pending", "processing"]:
-            return EnrichmentCreateResponse(
-                enrichment_id=existing.id,
-                transcription_id=transcription_id,
-                status=existing.status,
-                message=f"Enrichment already {existing.status}"
-            )
+    # 3. Déjà en cours ou terminé : retourner l'existant
+    if row is None:
+        existing = await db.run_sync(get_enrichment_by_transcription_id, transcription_id)
         
-        # Si terminé avec succès, ne pas recréer
         if existing.status == "done":
             return EnrichmentCreateResponse(
                 enrichment_id=existing.id,
@@ -135,39 +222,32 @@ async def trigger_enrichment(
                 message="Enrichment already completed"
             )
         
-        # Si erreur, on peut retenter (mettre à jour le retry_count)
-        if existing.status == "error":
-            existing.status = "pending"
-            existing.retry_count += 1
-            existing.last_error = None
-            db.commit()
-            db.refresh(existing)
-            
-            logger.info(
-                f"[{transcription_id[:8]}] Retry enrichment "
-                f"(attempt {existing.retry_count})"
-            )
-            
-            return EnrichmentCreateResponse(
-                enrichment_id=existing.id,
-                transcription_id=transcription_id,
-                status="pending",
-                message=f"Retry enrichment (attempt {existing.retry_count})"
-            )
-    
-    # 4. Créer un nouvel enrichissement
-    enrichment = create_enrichment(db, transcription_id)
+        return EnrichmentCreateResponse(
+            enrichment_id=existing.id,
+            transcription_id=transcription_id,
+            status=existing.status,
+            message=f"Enrichment already {existing.status}"
+        )
     
-    if not enrichment:
-        raise HTTPException(
-            status_code=500,
-            detail="Failed to create enrichment"
+    # 4. Erreur précédente relancée
+    if row.retry_count > 0:
+        logger.info(
+            f"[{transcription_id[:8]}] Retry enrichment "
+            f"(attempt {row.retry_count})"
+        )
+        
+        return EnrichmentCreateResponse(
+            enrichment_id=row.id,
+            transcription_id=transcription_id,
+            status="pending",
+            message=f"Retry enrichment (attempt {row.retry_count})"
         )
     
-    logger.info(f"[{transcription_id[:8]}] 🎨 Enrichment triggered: {enrichment.id}")
+    # 5. Nouvel enrichissement
+    logger.info(f"[{transcription_id[:8]}] 🎨 Enrichment triggered: {row.id}")
     
     return EnrichmentCreateResponse(
-        enrichment_id=enrichment.id,
+        enrichment_id=row.id,
         transcription_id=transcription_id,
         status="pending",
         message="Enrichment queued successfully"
@@ -177,7 +257,7 @@ async def trigger_enrichment(
 @router.get("/{transcription_id}", response_model=EnrichmentResponse)
 async def get_enrichment(
     transcription_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Récupère l'enrichissement d'une transcription
@@ -187,7 +267,7 @@ async def get_enrichment(
     Retourne le détail de l'enrichissement ou 404 si non trouvé
     """
     
-    enrichment = get_enrichment_by_transcription_id(db, transcription_id)
+    enrichment = await db.run_sync(get_enrichment_by_transcription_id, transcription_id)
     
     if not enrichment:
         raise HTTPException(
@@ -195,31 +275,13 @@ async def get_enrichment(
             detail=f"No enrichment found for transcription: {transcription_id}"
         )
     
-    return EnrichmentResponse(
-        id=enrichment.id,
-        transcription_id=enrichment.transcription_id,
-        status=enrichment.status,
-        title=enrichment.title,
-        summary=enrichment.summary,
-        bullets=enrichment.bullets,
-        sentiment=enrichment.sentiment,
-        sentiment_confidence=enrichment.sentiment_confidence,
-        topics=enrichment.topics,
-        llm_model=enrichment.llm_model,
-        generation_time=enrichment.generation_time,
-        tokens_generated=enrichment.tokens_generated,
-        retry_count=enrichment.retry_count,
-        last_error=enrichment.last_error,
-        created_at=enrichment.created_at.isoformat() if enrichment.created_at else None,
-        started_at=enrichment.started_at.isoformat() if enrichment.started_at else None,
-        finished_at=enrichment.finished_at.isoformat() if enrichment.finished_at else None
-    )
+    return _to_enrichment_response(enrichment)
 
 
 @router.get("/pending/list", response_model=List[EnrichmentResponse])
 async def list_pending_enrichments(
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Liste les enrichissements en attente
@@ -227,41 +289,50 @@ async def list_pending_enrichments(
     - **limit**: Nombre maximum d'enrichissements à retourner
     """
     
-    enrichments = get_pending_enrichments(db, limit=limit)
+    enrichments = await db.run_sync(get_pending_enrichments, limit)
+    
+    return [_to_enrichment_response(e) for e in enrichments]
+
+
+@router.get("/pending/with-transcriptions", response_model=List[PendingEnrichmentWithTranscription])
+async def list_pending_enrichments_with_transcriptions(
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Liste les enrichissements en attente avec le texte et les segments
+    de leur transcription (une seule requête JOIN)
+    
+    - **limit**: Nombre maximum d'enrichissements à retourner
+    """
+    
+    rows = await db.run_sync(get_pending_enrichments_with_transcriptions, limit)
     
     return [
-        EnrichmentResponse(
-            id=e.id,
-            transcription_id=e.transcription_id,
-            status=e.status,
-            title=e.title,
-            summary=e.summary,
-            bullets=e.bullets,
-            sentiment=e.sentiment,
-            sentiment_confidence=e.sentiment_confidence,
-            topics=e.topics,
-            llm_model=e.llm_model,
-            generation_time=e.generation_time,
-            tokens_generated=e.tokens_generated,
-            retry_count=e.retry_count,
-            last_error=e.last_error,
-            created_at=e.created_at.isoformat() if e.created_at else None,
-            started_at=e.started_at.isoformat() if e.started_at else None,
-            finished_at=e.finished_at.isoformat() if e.finished_at else None
+        PendingEnrichmentWithTranscription(
+            enrichment=_to_enrichment_response(e),
+            transcription=PendingTranscriptionPayload(
+                id=t.id,
+                status=t.status,
+                language=t.language,
+                duration=float(t.duration) if t.duration else None,
+                text=t.text,
+                segments=t.segments
+            )
         )
-        for e in enrichments
+        for e, t in rows
     ]
 
 
 @router.get("/stats/summary", response_model=EnrichmentStatsResponse)
-async def get_enrichment_stats(db: Session = Depends(get_db)):
+async def get_enrichment_stats(db: AsyncSession = Depends(get_async_db)):
     """
     Récupère les statistiques globales des enrichissements
     
     Retourne le nombre d'enrichissements par statut et les moyennes
     """
     
-    stats = get_stats_summary(db)
+    stats = await db.run_sync(get_stats_summary_cached)
     
     return EnrichmentStatsResponse(
         total=stats.get("total", 0),
@@ -278,7 +349,7 @@ async def get_enrichment_stats(db: Session = Depends(get_db)):
 @router.delete("/{transcription_id}")
 async def delete_enrichment(
     transcription_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Supprime l'enrichissement d'une transcription
@@ -288,7 +359,7 @@ async def delete_enrichment(
     Utile pour retenter un enrichissement ou nettoyer
     """
     
-    enrichment = get_enrichment_by_transcription_id(db, transcription_id)
+    enrichment = await db.run_sync(get_enrichment_by_transcription_id, transcription_id)
     
     if not enrichment:
         raise HTTPException(
@@ -296,8 +367,10 @@ async def delete_enrichment(
             detail=f"No enrichment found for transcription: {transcription_id}"
         )
     
-    db.delete(enrichment)
-    db.commit()
+    await db.delete(enrichment)
+    await db.commit()
+    invalidate_stats_cache()
+    _invalidate_combined_cache(transcription_id)
     
     logger.info(f"[{transcription_id[:8]}] 🗑️  Enrichment deleted: {enrichment.id}")
     
@@ -313,7 +386,7 @@ async def delete_enrichment(
 async def retry_enrichment(
     transcription_id: str,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Retente un enrichissement en erreur
@@ -323,7 +396,7 @@ async def retry_enrichment(
     Équivalent à supprimer puis recréer, mais garde l'historique des tentatives
     """
     
-    enrichment = get_enrichment_by_transcription_id(db, transcription_id)
+    enrichment = await db.run_sync(get_enrichment_by_transcription_id, transcription_id)
     
     if not enrichment:
         raise HTTPException(
@@ -344,8 +417,10 @@ async def retry_enrichment(
     enrichment.started_at = None
     enrichment.finished_at = None
     
-    db.commit()
-    db.refresh(enrichment)
+    await db.commit()
+    await db.refresh(enrichment)
+    invalidate_stats_cache()
+    _invalidate_combined_cache(transcription_id)
     
     logger.info(
         f"[{transcription_id[:8]}] 🔄 Enrichment retry: {enrichment.id} "
@@ -365,11 +440,48 @@ async def retry_enrichment(
 # Endpoint combiné (Transcription + Enrichissement)
 # ========================================
 
-@router.get("/combined/{transcription_id}")
+def _combined_transcription_dict(transcription: Transcription) -> dict:
+    """Partie transcription de /combined (orjson sérialise datetime/float directement)"""
+    return {
+        "id": transcription.id,
+        "status": transcription.status,
+        "language": transcription.language,
+        "duration": transcription.duration,
+        "processing_time": transcription.processing_time,
+        "text": transcription.text,
+        "segments_count": transcription.segments_count,
+        "vad_enabled": bool(transcription.vad_enabled),
+        "created_at": transcription.created_at,
+        "finished_at": transcription.finished_at
+    }
+
+
+def _combined_enrichment_dict(enrichment: Enrichment) -> dict:
+    """Partie enrichissement de /combined"""
+    return {
+        "id": enrichment.id,
+        "status": enrichment.status,
+        "title": enrichment.title,
+        "summary": enrichment.summary,
+        "bullets": enrichment.bullets,
+        "sentiment": enrichment.sentiment,
+        "sentiment_confidence": enrichment.sentiment_confidence,
+        "topics": enrichment.topics,
+        "llm_model": enrichment.llm_model,
+        "generation_time": enrichment.generation_time,
+        "tokens_generated": enrichment.tokens_generated,
+        "created_at": enrichment.created_at,
+        "finished_at": enrichment.finished_at
+    }
+
+
+# Pas de response_model : la réponse est sérialisée une seule fois par orjson,
+# sans seconde validation ni passage par jsonable_encoder
+@router.get("/combined/{transcription_id}", response_model=None)
 async def get_transcription_with_enrichment(
     transcription_id: str,
-    db: Session = Depends(get_db)
-):
+    db: AsyncSession = Depends(get_async_db)
+) -> Response:
     """
     Récupère la transcription ET son enrichissement en une seule requête
     
@@ -378,52 +490,36 @@ async def get_transcription_with_enrichment(
     Pratique pour le dashboard
     """
     
-    # Récupérer la transcription
-    transcription = db.query(Transcription).filter(
-        Transcription.id == transcription_id
-    ).first()
+    cached = _combined_cache.get(transcription_id)
+    if cached is not None:
+        if (await db.execute(COMBINED_STILL_DONE_STMT, {"tid": transcription_id})).first():
+            _combined_cache.move_to_end(transcription_id)
+            return Response(cached, media_type="application/json", headers=FINAL_CACHE_HEADERS)
+        _invalidate_combined_cache(transcription_id)
+    
+    row = (await db.execute(COMBINED_STMT, {"tid": transcription_id})).first()
     
-    if not transcription:
+    if not row:
         raise HTTPException(
             status_code=404,
             detail=f"Transcription not found: {transcription_id}"
         )
     
-    # Récupérer l'enrichissement (optionnel)
-    enrichment = get_enrichment_by_transcription_id(db, transcription_id)
-    
-    # Construire la réponse
-    response = {
-        "transcription": {
-            "id": transcription.id,
-            "status": transcription.status,
-            "language": transcription.language,
-            "duration": float(transcription.duration) if transcription.duration else None,
-            "processing_time": float(transcription.processing_time) if transcription.processing_time else None,
-            "text": transcription.text,
-            "segments_count": transcription.segments_count,
-            "vad_enabled": bool(transcription.vad_enabled),
-            "created_at": transcription.created_at.isoformat() if transcription.created_at else None,
-            "finished_at": transcription.finished_at.isoformat() if transcription.finished_at else None
-        },
-        "enrichment": None
+    transcription, enrichment = row
+    
+    payload = {
+        "transcription": _combined_transcription_dict(transcription),
+        "enrichment": _combined_enrichment_dict(enrichment) if enrichment else None
     }
     
-    if enrichment:
-        response["enrichment"] = {
-            "id": enrichment.id,
-            "status": enrichment.status,
-            "title": enrichment.title,
-            "summary": enrichment.summary,
-            "bullets": enrichment.bullets,
-            "sentiment": enrichment.sentiment,
-            "sentiment_confidence": enrichment.sentiment_confidence,
-            "topics": enrichment.topics,
-            "llm_model": enrichment.llm_model,
-            "generation_time": enrichment.generation_time,
-            "tokens_generated": enrichment.tokens_generated,
-            "created_at": enrichment.created_at.isoformat() if enrichment.created_at else None,
-            "finished_at": enrichment.finished_at.isoformat() if enrichment.finished_at else None
-        }
+    # Réponse directe : évite le passage par jsonable_encoder
+    response = ORJSONResponse(payload)
+    
+    # Une fois transcription et enrichissement terminés, la réponse ne change plus
+    if transcription.status == "done" and enrichment and enrichment.status == "done":
+        response.headers.update(FINAL_CACHE_HEADERS)
+        _combined_cache[transcription_id] = response.body
+        if len(_combined_cache) > COMBINED_CACHE_MAX_SIZE:
+            _combined_cache.popitem(last=False)
     
     return response
\ No newline at end of file
@@ -5,25 +5,25 @@ Point d'entrée principal de l'application FastAPI
 import os
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request, Depends
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, ORJSONResponse
 
-from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 import uvicorn
 
-from config import Config
-from database import engine, Base, Transcription
-from api.endpoints import router as api_router
-from api.dependencies import get_db
+from config import load_config
+from database import init_db
+from api.endpoints import router as api_router, render_dashboard, templates, warm_templates
+from api.dependencies import rate_limit_exceeded_handler
+from transcribe.transcription import QUEUE_FULL_MESSAGE, is_queue_full
 from logging_config import setup_logging, get_uvicorn_log_config
 
 # Initialiser la configuration
-config = Config()
+config = load_config()
 
 # Configurer le logging
 logger = setup_logging(
@@ -31,9 +31,6 @@ logger = setup_logging(
     log_file="logs/vocalyx.log" if not os.getenv("NO_LOG_FILE") else None
 )
 
-# Créer les tables
-Base.metadata.create_all(bind=engine)
-
 # Initialiser le limiteur de taux
 limiter = Limiter(key_func=get_remote_address)
 
@@ -42,9 +39,14 @@ async def lifespan(app: FastAPI):
     # --- Startup ---
     logger.info("🚀 Démarrage de l'application Vocalyx")
     
+    await init_db()
+    
+    warm_templates()
+    
     # Import depuis le nouveau module
-    from transcribe.transcription import initialize_whisper_model
+    from transcribe.transcription import initialize_whisper_model, start_transcription_workers
     await initialize_whisper_model()
+    await start_transcription_workers()
     
     yield  # --- App runs here ---
     
@@ -52,6 +54,12 @@ async def lifespan(app: FastAPI):
     logger.info("🛑 Arrêt de l'application Vocalyx")
     from transcribe.transcription import cleanup_resources
     await cleanup_resources()
+    
+    from api.enrichment_client import close_enrichment_client
+    await close_enrichment_client()
+    
+    from database import async_engine
+    await async_engine.dispose()
 
 # Créer l'application FastAPI
 app = FastAPI(
@@ -59,41 +67,66 @@ app = FastAPI(
     description="Vocalyx transforme automatiquement les enregistrements de call centers en transcriptions enrichies et exploitables.",
     version="1.4.0",  # Bump version
     contact={"name": "Guilhem RICHARD", "email": "guilhem.l.richard@gmail.com"},
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
+# Compression des réponses volumineuses (texte + segments)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=4)
+
 # Monter les fichiers statiques
 app.mount("/static", StaticFiles(directory="templates/static"), name="static")
 
 # Configurer le limiteur de taux
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
+
+# Rejeter les uploads trop volumineux ou sans place dans la file avant la lecture
+# du corps multipart (marge pour les en-têtes multipart, la limite exacte reste
+# vérifiée en streaming)
+MAX_UPLOAD_BYTES = config.max_file_size_bytes + 64 * 1024
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    if request.method == "POST":
+        content_length = request.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+            return ORJSONResponse(
+                {"detail": f"File too large: > {config.max_file_size_mb}MB"},
+                status_code=413
+            )
+        # File saturée : 429 avant la réception du corps multipart
+        if request.url.path == "/api/transcribe" and is_queue_full():
+            return ORJSONResponse({"detail": QUEUE_FULL_MESSAGE}, status_code=429)
+    return await call_next(request)
 
 # Inclure les routes de l'API
 app.include_router(api_router, prefix="/api")
 
-# Configurer les templates
-templates = Jinja2Templates(directory=config.templates_dir)
-
 @app.get("/", response_class=HTMLResponse, tags=["Root"])
-def root(request: Request):
+async def root(request: Request):
     """Page d'accueil - redirige vers le dashboard"""
     return templates.TemplateResponse("dashboard.html", {"request": request})
 
 @app.get("/dashboard", response_class=HTMLResponse, tags=["Dashboard"])
-def dashboard(request: Request, limit: int = 10, db: Session = Depends(get_db)):
-    entries = db.query(Transcription).order_by(Transcription.created_at.desc()).limit(limit).all()
-    return templates.TemplateResponse("dashboard.html", {"request": request, "entries": entries})
+async def dashboard(request: Request):
+    return render_dashboard(request)
 
 if __name__ == "__main__":
     log_config = get_uvicorn_log_config(
         log_level=os.getenv("LOG_LEVEL", "INFO")
     )
     
+    # Rechargement auto en développement uniquement (DEV=1), pas de watcher en production.
+    # Chaque worker charge son propre modèle Whisper : WEB_CONCURRENCY=1 par défaut.
     uvicorn.run(
         "app:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        reload=os.getenv("DEV") == "1",
+        backlog=2048,
         log_config=log_config
     )
\ No newline at end of file
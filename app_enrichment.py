@@ -5,25 +5,36 @@ Port par défaut: 8001
 Service séparé pour l'enrichissement, permet scalabilité indépendante
 """
 
+import hashlib
 import os
 import logging
+import orjson
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request
+from datetime import datetime
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 import uvicorn
 
-from config import Config
-from database import engine, Base
+from config import load_config
+from database import async_engine, init_db
 from api.enrichment_endpoints import router as enrichment_router
+from api.dependencies import get_async_db, rate_limit_exceeded_handler
+from enrichment import engine as enrichment_engine
+from enrichment.dependencies import get_enrichment_config
+from enrichment.models import get_stats_summary_cached
 from logging_config import setup_logging, get_uvicorn_log_config
 
 # Initialiser la configuration
-config = Config()
+config = load_config()
 
 # Configurer le logging
 logger = setup_logging(
@@ -31,9 +42,6 @@ logger = setup_logging(
     log_file="logs/enrichment_api.log"
 )
 
-# Créer les tables si nécessaire
-Base.metadata.create_all(bind=engine)
-
 # Initialiser le limiteur de taux
 limiter = Limiter(key_func=get_remote_address)
 
@@ -42,10 +50,17 @@ async def lifespan(app: FastAPI):
     # --- Startup ---
     logger.info("🎨 Démarrage du service d'enrichissement")
     
+    await init_db()
+    
+    # Connexion ouverte (et PRAGMAs appliqués) avant le premier appel
+    try:
+        await _database_reachable()
+    except Exception as e:
+        logger.warning(f"⚠️  Base de données injoignable au démarrage: {e}")
+    
     # Vérifier que le module d'enrichissement est configuré
     try:
-        from enrichment.config import EnrichmentConfig
-        enrich_config = EnrichmentConfig()
+        enrich_config = get_enrichment_config()
         
         if not enrich_config.enabled:
             logger.warning("⚠️  Enrichissement désactivé dans config.ini")
@@ -58,6 +73,8 @@ async def lifespan(app: FastAPI):
     
     # --- Shutdown ---
     logger.info("🛑 Arrêt du service d'enrichissement")
+    
+    await async_engine.dispose()
 
 # Créer l'application FastAPI
 app = FastAPI(
@@ -65,9 +82,13 @@ app = FastAPI(
     description="Service d'enrichissement de transcriptions via LLM",
     version="1.0.0",
     contact={"name": "Guilhem RICHARD", "email": "guilhem.l.richard@gmail.com"},
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
+# Compression des réponses volumineuses (texte + segments)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=4)
+
 # CORS - Permettre aux services de transcription d'appeler ce service
 app.add_middleware(
     CORSMiddleware,
@@ -83,7 +104,7 @@ app.add_middleware(
 
 # Configurer le limiteur de taux
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
 
 # Inclure les routes d'enrichissement
 app.include_router(enrichment_router, prefix="/api")
@@ -91,39 +112,69 @@ app.include_router(enrichment_router, prefix="/api")
 
 # ========================================
 # Endpoints de base (health, config)
+# Réponses ORJSONResponse construites directement : pas de passage
+# par jsonable_encoder pour ces dictionnaires simples
 # ========================================
 
-@app.get("/", tags=["Root"])
-def root():
-    """Page d'accueil du service d'enrichissement"""
-    return {
-        "service": "Vocalyx Enrichment API",
-        "version": "1.0.0",
-        "status": "running",
-        "endpoints": {
-            "docs": "/docs",
-            "health": "/health",
-            "config": "/config",
-            "trigger": "/api/enrichment/trigger/{transcription_id}",
-            "get": "/api/enrichment/{transcription_id}",
-            "stats": "/api/enrichment/stats/summary"
-        }
+# Corps de "/" constant : sérialisé une seule fois
+ROOT_BODY = orjson.dumps({
+    "service": "Vocalyx Enrichment API",
+    "version": "1.0.0",
+    "status": "running",
+    "endpoints": {
+        "docs": "/docs",
+        "health": "/health",
+        "liveness": "/livez",
+        "readiness": "/readyz",
+        "config": "/config",
+        "trigger": "/api/enrichment/trigger/{transcription_id}",
+        "get": "/api/enrichment/{transcription_id}",
+        "stats": "/api/enrichment/stats/summary"
     }
+})
+ROOT_ETAG = '"' + hashlib.md5(ROOT_BODY).hexdigest() + '"'
 
 
-@app.get("/health", tags=["System"])
-def health_check():
-    """Health check du service"""
-    from enrichment.config import EnrichmentConfig
-    from enrichment.models import get_stats_summary
-    from database import SessionLocal
-    
+@app.get("/", tags=["Root"], response_model=None)
+def root(request: Request):
+    """Page d'accueil du service d'enrichissement"""
+    if request.headers.get("if-none-match") == ROOT_ETAG:
+        return Response(status_code=304, headers={"ETag": ROOT_ETAG})
+    return Response(ROOT_BODY, media_type="application/json", headers={"ETag": ROOT_ETAG})
+
+
+async def _database_reachable() -> bool:
+    """Sonde légère de la base (SELECT 1 via le moteur async)"""
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    return True
+
+
+@app.get("/livez", tags=["System"], response_model=None)
+async def liveness():
+    """Liveness : le processus répond (aucun accès DB)"""
+    return ORJSONResponse({"status": "alive"})
+
+
+@app.get("/readyz", tags=["System"], response_model=None)
+async def readiness():
+    """Readiness : la base répond"""
+    try:
+        await _database_reachable()
+    except Exception as e:
+        return ORJSONResponse(status_code=503, content={"status": "unavailable", "error": str(e)})
+    return ORJSONResponse({"status": "ready"})
+
+
+@app.get("/health", tags=["System"], response_model=None)
+async def health_check():
+    """Health check du service (statistiques détaillées : /stats)"""
     status = "healthy"
     issues = []
     
     # Vérifier la config
     try:
-        enrich_config = EnrichmentConfig()
+        enrich_config = get_enrichment_config()
         if not enrich_config.enabled:
             issues.append("Enrichment disabled in config")
             status = "degraded"
@@ -131,72 +182,72 @@ def health_check():
         issues.append(f"Config error: {str(e)}")
         status = "unhealthy"
     
-    # Vérifier la DB
+    # Vérifier la DB (SELECT 1, pas d'agrégat)
     try:
-        db = SessionLocal()
-        stats = get_stats_summary(db)
-        db.close()
+        await _database_reachable()
     except Exception as e:
         issues.append(f"Database error: {str(e)}")
         status = "unhealthy"
     
-    return {
+    return ORJSONResponse({
         "status": status,
         "service": "enrichment",
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": datetime.utcnow(),
         "issues": issues if issues else None
-    }
+    })
 
 
-@app.get("/config", tags=["System"])
+@app.get("/config", tags=["System"], response_model=None)
 def get_config():
-    """Configuration du service d'enrichissement"""
-    from enrichment.config import EnrichmentConfig
-    
+    """Configuration du service d'enrichissement (lue une fois, voir /config/reload)"""
     try:
-        config = EnrichmentConfig()
-        return config.to_dict()
+        return ORJSONResponse(get_enrichment_config().to_dict())
     except Exception as e:
-        return {
+        return ORJSONResponse({
             "error": f"Failed to load config: {str(e)}"
-        }
+        })
+
+
+@app.post("/config/reload", tags=["System"], response_model=None)
+def reload_config():
+    """
+    Relit la section [ENRICHMENT] de config.ini.
+    La nouvelle instance est partagée avec le moteur ; un processeur LLM déjà
+    chargé garde ses paramètres de modèle jusqu'au redémarrage.
+    """
+    get_enrichment_config.cache_clear()
+    if enrichment_engine.enrichment_config is not None:
+        enrichment_engine.enrichment_config = get_enrichment_config()
+    logger.info("🔄 Configuration d'enrichissement rechargée")
+    return get_config()
 
 
 @app.get("/stats", tags=["System"])
-def get_service_stats():
-    """Statistiques du service"""
-    from enrichment.models import get_stats_summary
-    from database import SessionLocal
-    
-    db = SessionLocal()
-    try:
-        stats = get_stats_summary(db)
-        return {
-            "service": "enrichment",
-            "enrichments": stats
-        }
-    finally:
-        db.close()
+async def get_service_stats(db: AsyncSession = Depends(get_async_db)):
+    """Statistiques du service (session async : connexion prise seulement hors cache)"""
+    stats = await db.run_sync(get_stats_summary_cached)
+    # Encodage FastAPI conservé : les moyennes peuvent être des Decimal (PostgreSQL)
+    return {
+        "service": "enrichment",
+        "enrichments": stats
+    }
 
 
 # ========================================
 # Gestion des erreurs
 # ========================================
 
-from fastapi import HTTPException
-from fastapi.responses import JSONResponse
-from datetime import datetime
-
+# Réponses d'erreur encodées par orjson (datetime sérialisé nativement)
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     """Handler personnalisé pour les erreurs HTTP"""
     logger.warning(f"HTTP {exc.status_code}: {exc.detail} - {request.url}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "error": exc.detail,
             "status_code": exc.status_code,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": datetime.utcnow()
         }
     )
 
@@ -205,12 +256,12 @@ async def http_exception_handler(request: Request, exc: HTTPException):
 async def general_exception_handler(request: Request, exc: Exception):
     """Handler pour les erreurs non gérées"""
     logger.exception(f"Unhandled exception: {exc}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": "Internal server error",
             "message": str(exc),
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": datetime.utcnow()
         }
     )
 
@@ -226,6 +277,10 @@ if __name__ == "__main__":
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind")
     parser.add_argument("--port", type=int, default=8001, help="Port to bind")
     parser.add_argument("--reload", action="store_true", help="Enable auto-reload")
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("ENRICH_WORKERS", "1")),
+        help="Number of worker processes (ignored with --reload)"
+    )
     args = parser.parse_args()
     
     log_config = get_uvicorn_log_config(
@@ -238,6 +293,9 @@ if __name__ == "__main__":
         "app_enrichment:app",
         host=args.host,
         port=args.port,
+        loop="uvloop",
+        http="httptools",
+        workers=None if args.reload else args.workers,
         reload=args.reload,
         log_config=log_config
     )
\ No newline at end of file
@@ -5,8 +5,14 @@ Gestion de la configuration de l'application
 import os
 import logging
 import configparser
+import functools
+import pickle
+import orjson
 from pathlib import Path
-from typing import Set
+from typing import FrozenSet
+
+# À incrémenter quand les attributs produits par _load_settings changent
+CONFIG_CACHE_VERSION = 1
 
 class Config:
     """Charge et gère la configuration depuis config.ini"""
@@ -19,8 +25,44 @@ class Config:
         if not os.path.exists(config_file):
             self._create_default_config()
         
-        self.config.read(config_file)
-        self._load_settings()
+        self.mtime = os.path.getmtime(config_file)
+        if not self._load_cache():
+            self.config.read(config_file)
+            self._load_settings()
+            self._save_cache()
+    
+    @property
+    def _cache_file(self) -> Path:
+        """Cache des paramètres analysés, à côté du fichier source"""
+        path = Path(self.config_file)
+        return path.with_name(f".{path.name}.cache")
+    
+    def _cache_key(self) -> tuple:
+        return (CONFIG_CACHE_VERSION, os.path.abspath(self.config_file), self.mtime)
+    
+    def _load_cache(self) -> bool:
+        """Restaure les attributs depuis le cache si config.ini n'a pas changé"""
+        try:
+            with open(self._cache_file, 'rb') as f:
+                key, settings = pickle.load(f)
+        except Exception:
+            return False
+        if key != self._cache_key():
+            return False
+        self.__dict__.update(settings)
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        return True
+    
+    def _save_cache(self):
+        """Écrit les attributs analysés (sans le ConfigParser) ; échec silencieux"""
+        settings = {k: v for k, v in self.__dict__.items() if k not in ('config', 'config_file', 'mtime')}
+        tmp_file = self._cache_file.with_name(f"{self._cache_file.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_file, 'wb') as f:
+                pickle.dump((self._cache_key(), settings), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, self._cache_file)
+        except OSError:
+            pass
         
     def _create_default_config(self):
         """Crée un fichier de configuration par défaut"""
@@ -36,6 +78,7 @@ class Config:
         
         config['PERFORMANCE'] = {
             'max_workers': '2',
+            'max_queue_size': '20',
             'segment_length_ms': '60000',
             'vad_enabled': 'true',
             'beam_size': '5',
@@ -50,6 +93,7 @@ class Config:
         
         config['PATHS'] = {
             'upload_dir': './tmp_uploads',
+            'use_tmpfs': 'false',
             'database_path': 'sqlite:///./transcriptions.db',
             'templates_dir': 'templates'
         }
@@ -86,23 +130,38 @@ class Config:
         
         # PERFORMANCE
         self.max_workers = self.config.getint('PERFORMANCE', 'max_workers')
+        self.max_queue_size = self.config.getint('PERFORMANCE', 'max_queue_size', fallback=20)
         self.segment_length_ms = self.config.getint('PERFORMANCE', 'segment_length_ms')
         self.vad_enabled = self.config.getboolean('PERFORMANCE', 'vad_enabled')
         self.beam_size = self.config.getint('PERFORMANCE', 'beam_size')
         self.temperature = self.config.getfloat('PERFORMANCE', 'temperature')
+        self.best_of = self.config.getint('PERFORMANCE', 'best_of', fallback=1)
         
         # LIMITS
         self.max_file_size_mb = self.config.getint('LIMITS', 'max_file_size_mb')
+        self.max_file_size_bytes = self.max_file_size_mb * 1024 * 1024
         self.rate_limit = self.config.getint('LIMITS', 'rate_limit_per_minute')
-        self.allowed_extensions: Set[str] = set(
-            ext.strip() for ext in self.config.get('LIMITS', 'allowed_extensions').split(',')
+        self.allowed_extensions: FrozenSet[str] = frozenset(
+            ext.strip().lower()
+            for ext in self.config.get('LIMITS', 'allowed_extensions').split(',')
+            if ext.strip()
         )
         
         # PATHS
         self.upload_dir = Path(self.config.get('PATHS', 'upload_dir'))
+        # Uploads en RAM (tmpfs) : évite l'aller-retour disque avant Whisper
+        self.use_tmpfs = self.config.getboolean('PATHS', 'use_tmpfs', fallback=False)
+        if self.use_tmpfs and os.path.isdir('/dev/shm'):
+            self.upload_dir = Path('/dev/shm/vocalyx')
         self.database_path = self.config.get('PATHS', 'database_path')
         self.templates_dir = self.config.get('PATHS', 'templates_dir')
         
+        # DATABASE (pool de connexions hors SQLite, section optionnelle)
+        self.db_pool_size = self.config.getint('DATABASE', 'pool_size', fallback=20)
+        self.db_max_overflow = self.config.getint('DATABASE', 'max_overflow', fallback=10)
+        self.db_pool_timeout = self.config.getint('DATABASE', 'pool_timeout', fallback=30)
+        self.db_pool_recycle = self.config.getint('DATABASE', 'pool_recycle', fallback=3600)
+        
         # VAD
         self.vad_min_silence_len = self.config.getint('VAD', 'min_silence_len')
         self.vad_silence_thresh = self.config.getint('VAD', 'silence_thresh')
@@ -111,10 +170,54 @@ class Config:
         self.vad_min_silence_duration_ms = self.config.getint('VAD', 'min_silence_duration_ms')
         
         # Créer les répertoires
-        self.upload_dir.mkdir(exist_ok=True)
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Vue publique pré-sérialisée (servie telle quelle par /config)
+        self.public_dict = {
+            "whisper": {
+                "model": self.model,
+                "device": self.device,
+                "compute_type": self.compute_type,
+                "language": self.language,
+            },
+            "performance": {
+                "max_workers": self.max_workers,
+                "segment_length_ms": self.segment_length_ms,
+                "vad_enabled": self.vad_enabled,
+            },
+            "limits": {
+                "max_file_size_mb": self.max_file_size_mb,
+                "rate_limit_per_minute": self.rate_limit,
+                "allowed_extensions": sorted(self.allowed_extensions),
+            }
+        }
+        self.public_json = orjson.dumps(self.public_dict)
     
     def reload(self):
         """Recharge la configuration depuis le fichier"""
+        self.mtime = os.path.getmtime(self.config_file)
+        self.config = configparser.ConfigParser()
         self.config.read(self.config_file)
         self._load_settings()
-        logging.info("🔄 Configuration reloaded")
\ No newline at end of file
+        self._save_cache()
+        logging.info("🔄 Configuration reloaded")
+
+@functools.lru_cache(maxsize=None)
+def _load_config(abs_path: str) -> Config:
+    return Config(abs_path)
+
+def load_config(config_file: str = "config.ini") -> Config:
+    """
+    Retourne l'instance Config partagée pour ce fichier (lu une seule fois par processus).
+    Si le fichier a été modifié depuis (mtime), l'instance est rechargée en place
+    pour tous les modules qui la référencent. Le contrôle n'a lieu qu'à l'appel :
+    /api/config et /api/health le déclenchent en cours d'exécution ; les valeurs
+    copiées à l'import (limites, pool, modèle) restent celles du démarrage.
+    """
+    config = _load_config(os.path.abspath(config_file))
+    try:
+        if os.path.getmtime(config.config_file) != config.mtime:
+            config.reload()
+    except OSError:
+        pass  # Fichier supprimé : on garde la dernière configuration lue
+    return config
@@ -2,35 +2,268 @@
 Configuration de la base de données et modèles
 """
 
+import os
+import logging
+import zlib
+import orjson
 from datetime import datetime
-from sqlalchemy import create_engine, Column, String, Float, Text, Enum, DateTime, Integer, Boolean
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event, Column, String, Float, Text, DateTime, Integer, Boolean, JSON, LargeBinary, Index, SmallInteger, Enum, inspect
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.orm import sessionmaker, declarative_base, deferred
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
-from config import Config
+from config import load_config
 
-config = Config()
+config = load_config()
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
-engine = create_engine(config.database_path, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(bind=engine)
+
+# Dimensionnement du pool (hors SQLite) : section [DATABASE] de config.ini,
+# surchargeable par variables d'environnement.
+# Avec plusieurs workers uvicorn : workers x (pool_size + max_overflow) < max_connections
+POOL_OPTIONS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", config.db_pool_size)),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", config.db_max_overflow)),
+    "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", config.db_pool_timeout)),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", config.db_pool_recycle)),
+    "pool_pre_ping": True,
+}
+
+_is_sqlite = config.database_path.startswith("sqlite")
+
+# SQLite fichier : connexions conservées pour les workers de transcription
+# (la base en mémoire garde son SingletonThreadPool)
+if not _is_sqlite:
+    _sync_pool_options = POOL_OPTIONS
+elif ":memory:" in config.database_path or config.database_path == "sqlite://":
+    _sync_pool_options = {}
+else:
+    _sync_pool_options = {
+        "pool_size": config.max_workers,
+        "max_overflow": 2 * config.max_workers,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+    }
+
+# Colonnes JSON (segments, bullets, topics) sérialisées avec orjson
+def _orjson_serializer(value) -> str:
+    return orjson.dumps(value).decode()
+
+JSON_OPTIONS = {
+    "json_serializer": _orjson_serializer,
+    "json_deserializer": orjson.loads,
+}
+
+engine = create_engine(
+    config.database_path,
+    connect_args={"check_same_thread": False} if _is_sqlite else {},
+    query_cache_size=1200,  # Cache des requêtes compilées (défaut: 500)
+    **JSON_OPTIONS,
+    **_sync_pool_options
+)
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+
+# PRAGMAs SQLite appliqués à chaque nouvelle connexion (moteurs sync et async) :
+# WAL = lecteurs non bloqués pendant une écriture, NORMAL = moins de fsync
+SQLITE_PRAGMAS = (
+    # Nouvelle base : pages libérées récupérables par incremental_vacuum
+    # (base existante : effectif après un VACUUM complet)
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+
+def _set_sqlite_pragmas(dbapi_conn, connection_record):
+    cursor = dbapi_conn.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+if _is_sqlite:
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+
+def _async_database_url(url: str) -> str:
+    """Convertit l'URL synchrone vers le driver async équivalent"""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+# PgBouncer en mode transaction : pas d'état de session, donc pas de
+# requêtes préparées côté serveur (asyncpg en met en cache par défaut)
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+_async_connect_args = {
+    "statement_cache_size": 0,
+    "prepared_statement_cache_size": 0,
+} if DB_PGBOUNCER and not _is_sqlite else {}
+
+# Moteur async pour les endpoints FastAPI (ne bloque pas la boucle d'événements)
+# aiosqlite n'utilise pas de pool (NullPool) : options de pool hors SQLite uniquement
+async_engine = create_async_engine(
+    _async_database_url(config.database_path),
+    query_cache_size=1200,
+    connect_args=_async_connect_args,
+    **JSON_OPTIONS,
+    **({} if _is_sqlite else POOL_OPTIONS)
+)
+
+if not _is_sqlite:
+    logger.info(
+        f"🗄️ DB pool: pool_size={POOL_OPTIONS['pool_size']} "
+        f"max_overflow={POOL_OPTIONS['max_overflow']} "
+        f"timeout={POOL_OPTIONS['pool_timeout']}s recycle={POOL_OPTIONS['pool_recycle']}s"
+        f"{' (PgBouncer)' if DB_PGBOUNCER else ''}"
+    )
+if _is_sqlite:
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+class CompressedJSON(TypeDecorator):
+    """
+    JSON compressé (zlib) stocké en binaire.
+    Les lignes écrites avant la compression (JSON texte) restent lisibles.
+    """
+    impl = LargeBinary
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return zlib.compress(orjson.dumps(value), 3)
+    
+    def result_processor(self, dialect, coltype):
+        # Pas de conversion bytes() du type binaire : l'ancien format est du texte
+        def process(value):
+            if value is None:
+                return None
+            if isinstance(value, str):
+                return orjson.loads(value)
+            try:
+                return orjson.loads(zlib.decompress(value))
+            except zlib.error:
+                # Ancien JSON texte converti en binaire (migration PostgreSQL bytea)
+                return orjson.loads(value)
+        return process
+
+# Statuts stockés en entier (index de ce tuple) ; le code manipule les noms
+TRANSCRIPTION_STATUSES = ("pending", "processing", "done", "error")
+_STATUS_CODES = {name: code for code, name in enumerate(TRANSCRIPTION_STATUSES)}
+
+class StatusCode(TypeDecorator):
+    """
+    Statut stocké en SmallInteger, exposé sous son nom ("done", ...).
+    Les lignes antérieures encore en texte restent lisibles.
+    """
+    impl = SmallInteger
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        return _STATUS_CODES[value]
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return TRANSCRIPTION_STATUSES[int(value)]
+        except ValueError:
+            return value
 
 class Transcription(Base):
     """Modèle pour les transcriptions audio"""
     __tablename__ = "transcriptions"
+    __table_args__ = (
+        # Couvre le tri keyset "plus récents" (created_at DESC, id DESC) sans tri temporaire
+        Index("ix_transcriptions_created_at_id", "created_at", "id"),
+        # Filtres par statut (compteurs, nettoyage status IN (...) AND created_at < ?)
+        Index("ix_transcriptions_status_created_at", "status", "created_at"),
+    )
     
     id = Column(String, primary_key=True, index=True)
-    status = Column(Enum("pending", "processing", "done", "error"), default="pending")
+    status = Column(StatusCode, default="pending")  # Index composite (status, created_at)
     language = Column(String, nullable=True)
     processing_time = Column(Float, nullable=True)
     duration = Column(Float, nullable=True)
     text = Column(Text, nullable=True)
-    segments = Column(Text, nullable=True)  # JSON
+    segments = deferred(Column(CompressedJSON, nullable=True))  # Chargé à la demande
     error_message = Column(Text, nullable=True)
     segments_count = Column(Integer, nullable=True)
     vad_enabled = Column(Integer, default=0)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 audio + options
     
     # 🆕 Pour l'enrichissement
     enrichment_requested = Column(Integer, default=1)  # 1 = oui, 0 = non
     
-    created_at = Column(DateTime, default=datetime.utcnow)
-    finished_at = Column(DateTime, nullable=True)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow)  # Tri "plus récents" (index composite)
+    finished_at = Column(DateTime, nullable=True)
+
+
+# Création du schéma au démarrage (lifespan), désactivable quand les
+# migrations sont gérées à part ou avec plusieurs workers
+AUTO_CREATE_TABLES = os.getenv("AUTO_CREATE_TABLES", "1") == "1"
+
+def _create_schema(conn):
+    """Crée les tables manquantes puis les colonnes et index ajoutés depuis sur les tables existantes"""
+    Base.metadata.create_all(conn)
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        columns = {c["name"] for c in inspector.get_columns(table.name)}
+        # Colonnes nullables ajoutées depuis (ex. content_hash) : ALTER TABLE ADD COLUMN
+        for column in table.columns:
+            if column.name not in columns and column.nullable and not column.primary_key:
+                column_type = column.type.compile(dialect=conn.dialect)
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                )
+                columns.add(column.name)
+                logger.info(f"🗄️ Colonne ajoutée: {table.name}.{column.name}")
+        for index in table.indexes:
+            # Ignore les index portant sur des colonnes absentes d'un ancien schéma
+            if all(c.name in columns for c in index.columns):
+                index.create(conn, checkfirst=True)
+    
+    if conn.dialect.name == "postgresql":
+        column_types = {c["name"]: c["type"] for c in inspector.get_columns("transcriptions")}
+        # Ancienne colonne segments en TEXT : passage en bytea (segments compressés)
+        if not isinstance(column_types["segments"], LargeBinary):
+            conn.exec_driver_sql(
+                "ALTER TABLE transcriptions ALTER COLUMN segments TYPE bytea "
+                "USING convert_to(segments, 'UTF8')"
+            )
+            logger.info("🗄️ transcriptions.segments converti en bytea")
+        
+        # Ancien statut Enum (type natif ou texte) : passage en smallint
+        status_type = column_types["status"]
+        if not isinstance(status_type, Integer):
+            conn.exec_driver_sql("ALTER TABLE transcriptions ALTER COLUMN status DROP DEFAULT")
+            conn.exec_driver_sql(
+                "ALTER TABLE transcriptions ALTER COLUMN status TYPE smallint USING CASE status::text "
+                + " ".join(f"WHEN '{name}' THEN {code}" for name, code in _STATUS_CODES.items())
+                + " END"
+            )
+            if isinstance(status_type, Enum) and status_type.name:
+                conn.exec_driver_sql(f'DROP TYPE IF EXISTS "{status_type.name}"')
+            logger.info("🗄️ transcriptions.status converti en smallint")
+    
+    if conn.dialect.name == "sqlite":
+        # Conversion des statuts texte (ancien schéma) en codes entiers
+        conn.exec_driver_sql(
+            "UPDATE transcriptions SET status = CASE status "
+            + " ".join(f"WHEN '{name}' THEN {code}" for name, code in _STATUS_CODES.items())
+            + " END WHERE status IN ("
+            + ", ".join(f"'{name}'" for name in TRANSCRIPTION_STATUSES)
+            + ")"
+        )
+
+async def init_db():
+    """Crée les tables et index manquants via le moteur async"""
+    if not AUTO_CREATE_TABLES:
+        return
+    async with async_engine.begin() as conn:
+        await conn.run_sync(_create_schema)
@@ -6,130 +6,107 @@ Configuration du module d'enrichissement
 import os
 import configparser
 import logging
+import pickle
+from dataclasses import dataclass, field, fields
 from pathlib import Path
 from typing import Optional
 
 
 logger = logging.getLogger(__name__)
 
+# À incrémenter quand les champs d'EnrichmentConfig ou leur lecture changent
+ENRICHMENT_CONFIG_CACHE_VERSION = 3
 
+
+@dataclass(frozen=True, slots=True)
 class EnrichmentConfig:
-    """Configuration pour le module d'enrichissement"""
+    """
+    Configuration pour le module d'enrichissement (immuable, partageable entre threads)
+    Chargement depuis un fichier : EnrichmentConfig.from_ini("config.ini")
+    """
     
-    def __init__(self, config_file: str = "config.ini"):
-        self.config_file = config_file
-        self.config = configparser.ConfigParser()
-        
-        if not os.path.exists(config_file):
-            logger.warning(f"Config file not found: {config_file}, using defaults")
-            self._set_defaults()
-        else:
-            self.config.read(config_file)
-            self._load_settings()
+    # Worker
+    enabled: bool = True
+    poll_interval_seconds: int = 15
+    batch_size: int = 3
+    max_retries: int = 3
+    retry_delay_seconds: int = 60
     
-    def _set_defaults(self):
-        """Définit les valeurs par défaut"""
-        self.enabled = True
-        self.poll_interval_seconds = 15
-        self.batch_size = 3
-        self.max_retries = 3
-        self.retry_delay_seconds = 60
-        
-        self.model_path = "models/mistral-7b-instruct-v0.3.Q4_K_M.gguf"
-        self.model_type = "mistral"
-        self.n_ctx = 4096
-        self.n_threads = 6
-        self.n_batch = 512
-        self.temperature = 0.3
-        self.top_p = 0.9
-        self.top_k = 40
-        self.repeat_penalty = 1.1
-        self.max_tokens = 500
-        
-        self.max_transcription_chars = 15000
-        self.min_transcription_chars = 100
-        
-        self.generate_title = True
-        self.generate_summary = True
-        self.generate_bullets = True
-        self.generate_sentiment = True
-        self.generate_topics = False
-        
-        self.prompt_language = "fr"
-        self.output_language = "fr"
-        
-        self.database_path = "sqlite:///./transcriptions.db"
-        
-        self.log_level = "INFO"
-        self.log_file = "logs/enrichment.log"
+    # Modèle
+    model_path: str = "models/mistral-7b-instruct-v0.3.Q4_K_M.gguf"
+    model_type: str = "mistral"
+    n_ctx: int = 4096
+    n_threads: int = 6
+    n_batch: int = 512
+    temperature: float = 0.3
+    top_p: float = 0.9
+    top_k: int = 40
+    repeat_penalty: float = 1.1
+    max_tokens: int = 500
     
-    def _load_settings(self):
-        """Charge les paramètres depuis config.ini"""
-        
-        # ENRICHMENT section
-        if self.config.has_section('ENRICHMENT'):
-            self.enabled = self.config.getboolean('ENRICHMENT', 'enabled', fallback=True)
-            self.poll_interval_seconds = self.config.getint('ENRICHMENT', 'poll_interval_seconds', fallback=15)
-            self.batch_size = self.config.getint('ENRICHMENT', 'batch_size', fallback=3)
-            self.max_retries = self.config.getint('ENRICHMENT', 'max_retries', fallback=3)
-            self.retry_delay_seconds = self.config.getint('ENRICHMENT', 'retry_delay_seconds', fallback=60)
-            
-            self.model_path = self.config.get('ENRICHMENT', 'model_path', 
-                                             fallback='models/mistral-7b-instruct-v0.3.Q4_K_M.gguf')
-            self.model_type = self.config.get('ENRICHMENT', 'model_type', fallback='mistral')
-            self.n_ctx = self.config.getint('ENRICHMENT', 'n_ctx', fallback=4096)
-            self.n_threads = self.config.getint('ENRICHMENT', 'n_threads', fallback=6)
-            self.n_batch = self.config.getint('ENRICHMENT', 'n_batch', fallback=512)
-            self.temperature = self.config.getfloat('ENRICHMENT', 'temperature', fallback=0.3)
-            self.top_p = self.config.getfloat('ENRICHMENT', 'top_p', fallback=0.9)
-            self.top_k = self.config.getint('ENRICHMENT', 'top_k', fallback=40)
-            self.repeat_penalty = self.config.getfloat('ENRICHMENT', 'repeat_penalty', fallback=1.1)
-            self.max_tokens = self.config.getint('ENRICHMENT', 'max_tokens', fallback=500)
-            
-            self.max_transcription_chars = self.config.getint('ENRICHMENT', 'max_transcription_chars', fallback=15000)
-            self.min_transcription_chars = self.config.getint('ENRICHMENT', 'min_transcription_chars', fallback=100)
-            
-            self.generate_title = self.config.getboolean('ENRICHMENT', 'generate_title', fallback=True)
-            self.generate_summary = self.config.getboolean('ENRICHMENT', 'generate_summary', fallback=True)
-            self.generate_bullets = self.config.getboolean('ENRICHMENT', 'generate_bullets', fallback=True)
-            self.generate_sentiment = self.config.getboolean('ENRICHMENT', 'generate_sentiment', fallback=True)
-            self.generate_topics = self.config.getboolean('ENRICHMENT', 'generate_topics', fallback=False)
-            
-            self.prompt_language = self.config.get('ENRICHMENT', 'prompt_language', fallback='fr')
-            self.output_language = self.config.get('ENRICHMENT', 'output_language', fallback='fr')
-        else:
-            logger.warning("No [ENRICHMENT] section found, using defaults")
-            self._set_defaults()
-        
-        # DATABASE section (fallback to main config if not in ENRICHMENT)
-        if self.config.has_section('DATABASE'):
-            self.database_path = self.config.get('DATABASE', 'database_path', 
-                                                 fallback='sqlite:///./transcriptions.db')
-        elif self.config.has_section('PATHS'):
-            self.database_path = self.config.get('PATHS', 'database_path',
-                                                 fallback='sqlite:///./transcriptions.db')
-        else:
-            self.database_path = 'sqlite:///./transcriptions.db'
+    # Limites
+    max_transcription_chars: int = 15000
+    min_transcription_chars: int = 100
+    
+    # Fonctionnalités
+    generate_title: bool = True
+    generate_summary: bool = True
+    generate_bullets: bool = True
+    generate_sentiment: bool = True
+    generate_topics: bool = False
+    
+    # Langues
+    prompt_language: str = "fr"
+    output_language: str = "fr"
+    
+    database_path: str = "sqlite:///./transcriptions.db"
+    
+    log_level: str = "INFO"
+    log_file: str = "logs/enrichment.log"
+    
+    config_file: str = "config.ini"
+    
+    # Résultat de to_dict(), construit au premier appel
+    _dict_cache: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+    # (mtime du modèle, résultat de validate())
+    _validation_cache: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+    
+    @classmethod
+    def from_ini(cls, config_file: str = "config.ini") -> "EnrichmentConfig":
+        """Charge la configuration depuis config.ini (cache disque si le fichier n'a pas changé)"""
+        if not os.path.exists(config_file):
+            logger.warning(f"Config file not found: {config_file}, using defaults")
+            return cls(config_file=config_file)
         
-        # LOGGING section
-        if self.config.has_section('LOGGING'):
-            self.log_level = self.config.get('LOGGING', 'level', fallback='INFO')
-            self.log_file = self.config.get('LOGGING', 'file_path', fallback='logs/enrichment.log')
-        else:
-            self.log_level = 'INFO'
-            self.log_file = 'logs/enrichment.log'
+        key = _cache_key(config_file)
+        settings = _load_cache(config_file, key)
+        if settings is None:
+            settings = _parse_settings(config_file)
+            _save_cache(config_file, key, settings)
+        return cls(config_file=config_file, **settings)
     
     def validate(self) -> tuple[bool, list[str]]:
         """
         Valide la configuration
+        Résultat conservé tant que le fichier modèle n'a pas changé (un seul stat par appel)
         
         Returns:
             (is_valid, errors)
         """
+        try:
+            model_mtime = os.stat(self.model_path).st_mtime_ns
+        except OSError:
+            model_mtime = None
+        
+        cached = self._validation_cache
+        if cached is not None and cached[0] == model_mtime:
+            is_valid, errors = cached[1]
+            return is_valid, list(errors)
+        
         errors = []
         
         # Vérifier que le modèle existe
-        if not Path(self.model_path).exists():
+        if model_mtime is None:
             errors.append(f"Model file not found: {self.model_path}")
         
         # Vérifier les valeurs numériques
@@ -160,10 +137,19 @@ class EnrichmentConfig:
         ]):
             errors.append("At least one generation option must be enabled")
         
+        object.__setattr__(self, '_validation_cache', (model_mtime, (len(errors) == 0, tuple(errors))))
         return len(errors) == 0, errors
     
     def to_dict(self) -> dict:
-        """Retourne la config sous forme de dictionnaire"""
+        """
+        Retourne la config sous forme de dictionnaire
+        (construit une seule fois, partagé entre appelants : ne pas modifier)
+        """
+        if self._dict_cache is None:
+            object.__setattr__(self, '_dict_cache', self._build_dict())
+        return self._dict_cache
+    
+    def _build_dict(self) -> dict:
         return {
             'enabled': self.enabled,
             'worker': {
@@ -214,6 +200,94 @@ class EnrichmentConfig:
         return f"<EnrichmentConfig(model={Path(self.model_path).name}, enabled={self.enabled})>"
 
 
+# Champs lus dans [ENRICHMENT] (les autres viennent de [DATABASE]/[PATHS] et [LOGGING])
+_FIELD_TYPES = {f.name: f.type for f in fields(EnrichmentConfig) if f.init}
+_ENRICHMENT_KEYS = frozenset(_FIELD_TYPES) - {'database_path', 'log_level', 'log_file', 'config_file'}
+
+
+def _convert(name: str, value: str):
+    """Convertit une valeur brute selon le type du champ"""
+    field_type = _FIELD_TYPES[name]
+    if field_type is bool:
+        if value.lower() not in configparser.ConfigParser.BOOLEAN_STATES:
+            raise ValueError(f"Not a boolean: {value}")
+        return configparser.ConfigParser.BOOLEAN_STATES[value.lower()]
+    return field_type(value)
+
+
+def _parse_settings(config_file: str) -> dict:
+    """Lit config.ini (une lecture par section) ; seules les clés présentes sont retournées"""
+    # Aucune valeur n'utilise %(var)s : pas d'interpolation à chaque lecture
+    parser = configparser.RawConfigParser()
+    parser.read(config_file)
+    
+    def section(name: str) -> dict:
+        return dict(parser.items(name)) if parser.has_section(name) else {}
+    
+    # ENRICHMENT section
+    enrichment = section('ENRICHMENT')
+    if not enrichment:
+        logger.warning("No [ENRICHMENT] section found, using defaults")
+    settings = {
+        name: _convert(name, value)
+        for name, value in enrichment.items()
+        if name in _ENRICHMENT_KEYS
+    }
+    
+    # DATABASE section (fallback to main config if not in ENRICHMENT)
+    database_path = section('DATABASE').get('database_path') or section('PATHS').get('database_path')
+    if database_path:
+        settings['database_path'] = database_path
+    
+    # LOGGING section
+    logging_sec = section('LOGGING')
+    if 'level' in logging_sec:
+        settings['log_level'] = logging_sec['level']
+    if 'file_path' in logging_sec:
+        settings['log_file'] = logging_sec['file_path']
+    
+    return settings
+
+
+def _cache_file(config_file: str) -> Path:
+    """Cache des paramètres analysés, à côté du fichier source"""
+    path = Path(config_file)
+    return path.with_name(f".{path.name}.enrichment.cache")
+
+
+def _cache_key(config_file: str) -> Optional[tuple]:
+    try:
+        st = os.stat(config_file)
+    except OSError:
+        return None
+    return (ENRICHMENT_CONFIG_CACHE_VERSION, os.path.abspath(config_file),
+            st.st_mtime_ns, st.st_size)
+
+
+def _load_cache(config_file: str, key: Optional[tuple]) -> Optional[dict]:
+    """Paramètres en cache si config.ini n'a pas changé, sinon None"""
+    if key is None:
+        return None
+    try:
+        with open(_cache_file(config_file), 'rb') as f:
+            cached_key, settings = pickle.load(f)
+    except Exception:
+        return None
+    return settings if cached_key == key else None
+
+
+def _save_cache(config_file: str, key: Optional[tuple], settings: dict):
+    """Écrit les paramètres analysés ; échec silencieux"""
+    cache_file = _cache_file(config_file)
+    tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_file, 'wb') as f:
+            pickle.dump((key, settings), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass
+
+
 def create_default_enrichment_section() -> str:
     """
     Retourne le texte d'une section [ENRICHMENT] par défaut
@@ -265,7 +339,7 @@ if __name__ == "__main__":
     # Test de la config
     print("=== Test EnrichmentConfig ===\n")
     
-    config = EnrichmentConfig()
+    config = EnrichmentConfig.from_ini()
     
     print("Configuration chargée:")
     print(f"  Enabled: {config.enabled}")
@@ -6,10 +6,11 @@ Dépendances FastAPI pour l'injection de configuration
 from functools import lru_cache
 from enrichment.config import EnrichmentConfig
 
-@lru_cache()
+@lru_cache(maxsize=1)
 def get_enrichment_config() -> EnrichmentConfig:
     """
     Dépendance FastAPI pour récupérer la config (singleton via lru_cache)
+    Même instance que enrichment.engine.enrichment_config (un seul chargement par processus)
     Usage: config: EnrichmentConfig = Depends(get_enrichment_config)
     """
-    return EnrichmentConfig()
\ No newline at end of file
+    return EnrichmentConfig.from_ini()
\ No newline at end of file
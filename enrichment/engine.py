@@ -7,11 +7,10 @@ import asyncio
 import concurrent.futures
 import gc
 import logging
+from datetime import datetime
 from typing import Optional
 
-from enrichment.config import EnrichmentConfig
-from enrichment.processors import create_processor_from_config
-from enrichment.worker import EnrichmentWorker
+from enrichment.dependencies import get_enrichment_config
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +18,9 @@ logger = logging.getLogger(__name__)
 enrichment_processor = None
 enrichment_executor = None
 enrichment_config = None
+# Résolus une fois à l'initialisation (pas de lookup par job)
+enrichment_process = None
+enrichment_gen_config = None
 
 async def initialize_enrichment_engine():
     """
@@ -26,11 +28,12 @@ async def initialize_enrichment_engine():
     Équivalent de initialize_whisper_model() pour la transcription.
     """
     global enrichment_processor, enrichment_executor, enrichment_config
+    global enrichment_process, enrichment_gen_config
     
     logger.info("🎨 Initialisation du moteur d'enrichissement...")
     
-    # Charger la config
-    enrichment_config = EnrichmentConfig()
+    # Charger la config (instance partagée avec les endpoints FastAPI)
+    enrichment_config = get_enrichment_config()
     
     if not enrichment_config.enabled:
         logger.warning("⚠️  Enrichissement désactivé dans config.ini")
@@ -57,12 +60,15 @@ async def initialize_enrichment_engine():
     
     logger.info(f"🔄 Chargement du processeur LLM ({max_workers} workers)...")
     
-    # Charger le processeur dans l'executor
+    # Charger le processeur dans l'executor (llama_cpp importé seulement ici)
+    from enrichment.processors import create_processor_from_config
     enrichment_processor = await loop.run_in_executor(
         enrichment_executor,
         create_processor_from_config,
         enrichment_config
     )
+    enrichment_process = enrichment_processor.process
+    enrichment_gen_config = getattr(enrichment_processor, 'gen_config', None)
     
     logger.info(
         f"✅ Moteur d'enrichissement prêt | "
@@ -73,12 +79,17 @@ async def initialize_enrichment_engine():
 
 async def cleanup_enrichment_resources():
     """Nettoie les ressources du moteur d'enrichissement"""
-    global enrichment_processor, enrichment_executor
+    global enrichment_processor, enrichment_executor, enrichment_config
+    global enrichment_process, enrichment_gen_config
     
     try:
         logger.info("🛑 Arrêt du moteur d'enrichissement...")
         
         enrichment_processor = None
+        enrichment_process = None
+        enrichment_gen_config = None
+        enrichment_config = None
+        get_enrichment_config.cache_clear()
         gc.collect()
 
         if enrichment_executor:
@@ -104,102 +115,82 @@ async def run_enrichment_async(transcription_id: str):
         return
     
     from database import SessionLocal, Transcription
-    from enrichment.models import create_enrichment
-    from datetime import datetime
-    
-    db = SessionLocal()
+    from enrichment.models import create_enrichment, invalidate_stats_cache
     
-    try:
-        # Créer l'entrée enrichment
-        enrichment = create_enrichment(db, transcription_id)
-        if not enrichment:
-            logger.warning(f"[{transcription_id[:8]}] Enrichissement déjà existant")
-            db.close()
-            return
-        
-        # Marquer comme processing
-        enrichment.status = 'processing'
-        enrichment.started_at = datetime.utcnow()
-        db.commit()
-        db.close()
-        
-        # Récupérer la transcription
-        db = SessionLocal()
-        transcription = db.query(Transcription).filter(
-            Transcription.id == transcription_id
-        ).first()
-        
-        if not transcription or not transcription.text:
-            enrichment = db.query(Enrichment).filter(
-                Enrichment.transcription_id == transcription_id
-            ).first()
-            enrichment.status = 'error'
-            enrichment.last_error = 'No transcription text'
-            enrichment.finished_at = datetime.utcnow()
+    # Une seule session pour tout le traitement (connexion relâchée après chaque commit)
+    with SessionLocal() as db:
+        enrichment = None
+        try:
+            # Créer l'entrée enrichment
+            enrichment = create_enrichment(db, transcription_id)
+            if not enrichment:
+                logger.warning(f"[{transcription_id[:8]}] Enrichissement déjà existant")
+                return
+            
+            # Récupérer le texte de la transcription
+            text = db.query(Transcription.text).filter(
+                Transcription.id == transcription_id
+            ).scalar()
+            
+            if not text:
+                enrichment.status = 'error'
+                enrichment.last_error = 'No transcription text'
+                enrichment.finished_at = datetime.utcnow()
+                db.commit()
+                return
+            
+            # Marquer comme processing (validé avant la génération : pas de verrou
+            # d'écriture SQLite conservé pendant l'appel au LLM)
+            enrichment.status = 'processing'
+            enrichment.started_at = datetime.utcnow()
             db.commit()
-            db.close()
-            return
-        
-        text = transcription.text
-        db.close()
-        
-        logger.info(f"[{transcription_id[:8]}] 🎨 Enrichissement démarré...")
-        
-        # Exécuter le traitement dans l'executor (non-bloquant)
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            enrichment_executor,
-            enrichment_processor.process,
-            text,
-            "all_in_one",
-            enrichment_processor.gen_config if hasattr(enrichment_processor, 'gen_config') else None
-        )
-        
-        # Sauvegarder le résultat
-        db = SessionLocal()
-        enrichment = db.query(Enrichment).filter(
-            Enrichment.transcription_id == transcription_id
-        ).first()
-        
-        if result.success:
-            enrichment.status = 'done'
-            enrichment.title = result.title
-            enrichment.summary = result.summary
-            enrichment.bullets = result.bullets
-            enrichment.sentiment = result.sentiment
-            enrichment.sentiment_confidence = result.sentiment_confidence
-            enrichment.topics = result.topics
-            enrichment.llm_model = result.model_used
-            enrichment.generation_time = result.generation_time
-            enrichment.tokens_generated = result.tokens_generated
             
-            logger.info(
-                f"[{transcription_id[:8]}] ✅ Enrichissement terminé | "
-                f"Titre: \"{result.title[:40]}...\" | "
-                f"Sentiment: {result.sentiment} | "
-                f"Temps: {result.generation_time}s"
+            logger.info(f"[{transcription_id[:8]}] 🎨 Enrichissement démarré...")
+            
+            # Exécuter le traitement dans l'executor (non-bloquant)
+            loop = asyncio.get_event_loop()
+            result = await loop.run_in_executor(
+                enrichment_executor,
+                enrichment_process,
+                text,
+                "all_in_one",
+                enrichment_gen_config
             )
-        else:
-            enrichment.status = 'error'
-            enrichment.last_error = result.error_message
-            logger.error(f"[{transcription_id[:8]}] ❌ Échec: {result.error_message}")
-        
-        enrichment.finished_at = datetime.utcnow()
-        db.commit()
-        
-    except Exception as e:
-        logger.exception(f"[{transcription_id[:8]}] ❌ Erreur: {e}")
-        
-        db = SessionLocal()
-        enrichment = db.query(Enrichment).filter(
-            Enrichment.transcription_id == transcription_id
-        ).first()
-        
-        if enrichment:
-            enrichment.status = 'error'
-            enrichment.last_error = str(e)
+            
+            # Sauvegarder le résultat
+            if result.success:
+                enrichment.status = 'done'
+                enrichment.title = result.title
+                enrichment.summary = result.summary
+                enrichment.bullets = result.bullets
+                enrichment.sentiment = result.sentiment
+                enrichment.sentiment_confidence = result.sentiment_confidence
+                enrichment.topics = result.topics
+                enrichment.llm_model = result.model_used
+                enrichment.generation_time = result.generation_time
+                enrichment.tokens_generated = result.tokens_generated
+                
+                logger.info(
+                    f"[{transcription_id[:8]}] ✅ Enrichissement terminé | "
+                    f"Titre: \"{result.title[:40]}...\" | "
+                    f"Sentiment: {result.sentiment} | "
+                    f"Temps: {result.generation_time}s"
+                )
+            else:
+                enrichment.status = 'error'
+                enrichment.last_error = result.error_message
+                logger.error(f"[{transcription_id[:8]}] ❌ Échec: {result.error_message}")
+            
             enrichment.finished_at = datetime.utcnow()
             db.commit()
-        
-    finally:
-        db.close()
\ No newline at end of file
+            invalidate_stats_cache()
+            
+        except Exception as e:
+            logger.exception(f"[{transcription_id[:8]}] ❌ Erreur: {e}")
+            
+            db.rollback()
+            if enrichment is not None:
+                enrichment.status = 'error'
+                enrichment.last_error = str(e)
+                enrichment.finished_at = datetime.utcnow()
+                db.commit()
@@ -8,15 +8,21 @@ Gère la table des enrichissements dans la base de données.
 from datetime import datetime
 from sqlalchemy import (
     Column, String, Float, Text, Integer, 
-    DateTime, ForeignKey, JSON, Boolean
+    DateTime, ForeignKey, JSON, Boolean, select
 )
 from sqlalchemy.orm import relationship
 
 from database import Base, engine
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Cache en mémoire des statistiques : invalidé par numéro de version à chaque
+# écriture, TTL court en filet de sécurité (écritures d'autres processus)
+STATS_CACHE_TTL = 5.0
+_stats_cache = {"version": 0, "cached_version": -1, "expires": 0.0, "value": None}
+
 
 class Enrichment(Base):
     """
@@ -223,13 +229,78 @@ def get_pending_enrichments(session, limit=10):
     Returns:
         Liste d'objets Enrichment
     """
-    return (
-        session.query(Enrichment)
-        .filter(Enrichment.status == "pending")
+    return session.scalars(
+        select(Enrichment)
+        .where(Enrichment.status == "pending")
         .order_by(Enrichment.created_at.asc())
         .limit(limit)
-        .all()
-    )
+    ).all()
+
+
+def get_pending_enrichments_with_transcriptions(session, limit=10):
+    """
+    Récupère les enrichissements en attente avec leur transcription,
+    en une seule requête (JOIN) au lieu d'une requête par transcription.
+    
+    Args:
+        session: Session SQLAlchemy
+        limit: Nombre maximum d'enrichissements à récupérer
+        
+    Returns:
+        Liste de tuples (Enrichment, Transcription)
+    """
+    from sqlalchemy.orm import undefer
+    from database import Transcription
+    
+    return session.execute(
+        select(Enrichment, Transcription)
+        .join(Transcription, Transcription.id == Enrichment.transcription_id)
+        .where(Enrichment.status == "pending")
+        .options(undefer(Transcription.segments))
+        .order_by(Enrichment.created_at.asc())
+        .limit(limit)
+    ).all()
+
+
+def claim_pending_enrichments(session, limit=10):
+    """
+    Réserve atomiquement des enrichissements en attente (pending -> processing).
+    Les lignes verrouillées par un autre worker sont ignorées (SKIP LOCKED),
+    ce qui permet de lancer plusieurs workers sans traitement en double.
+    
+    Args:
+        session: Session SQLAlchemy
+        limit: Nombre maximum d'enrichissements à réserver
+        
+    Returns:
+        Liste des transcription_id réservés
+    """
+    from sqlalchemy import update
+    
+    ids = session.scalars(
+        select(Enrichment.id)
+        .where(Enrichment.status == "pending")
+        .order_by(Enrichment.created_at.asc())
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    
+    if not ids:
+        session.rollback()
+        return []
+    
+    # Le filtre sur status garantit qu'une ligne n'est réservée qu'une fois
+    # (SQLite ignore FOR UPDATE mais sérialise les écritures)
+    claimed = session.scalars(
+        update(Enrichment)
+        .where(Enrichment.id.in_(ids), Enrichment.status == "pending")
+        .values(status="processing", started_at=datetime.utcnow())
+        .returning(Enrichment.transcription_id)
+    ).all()
+    session.commit()
+    invalidate_stats_cache()
+    
+    return claimed
 
 
 def get_enrichment_by_transcription_id(session, transcription_id: str):
@@ -243,11 +314,9 @@ def get_enrichment_by_transcription_id(session, transcription_id: str):
     Returns:
         Enrichment ou None
     """
-    return (
-        session.query(Enrichment)
-        .filter(Enrichment.transcription_id == transcription_id)
-        .first()
-    )
+    return session.scalars(
+        select(Enrichment).where(Enrichment.transcription_id == transcription_id)
+    ).first()
 
 
 def create_enrichment(session, transcription_id: str):
@@ -276,6 +345,7 @@ def create_enrichment(session, transcription_id: str):
         session.add(enrichment)
         session.commit()
         session.refresh(enrichment)
+        invalidate_stats_cache()
         
         logger.info(f"✅ Enrichissement créé: {enrichment.id} pour {transcription_id}")
         return enrichment
@@ -286,6 +356,51 @@ def create_enrichment(session, transcription_id: str):
         return None
 
 
+def upsert_enrichment(session, transcription_id: str):
+    """
+    Crée l'enrichissement, ou relance celui en erreur, en une seule requête
+    (INSERT ... ON CONFLICT DO UPDATE ... RETURNING).
+    
+    Args:
+        session: Session SQLAlchemy
+        transcription_id: ID de la transcription
+        
+    Returns:
+        Ligne (id, status, retry_count) créée ou relancée (retry_count == 0
+        pour une création), ou None si un enrichissement pending/processing/done
+        existe déjà
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    
+    stmt = insert(Enrichment).values(
+        transcription_id=transcription_id,
+        status="pending",
+        retry_count=0,
+        created_at=datetime.utcnow()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Enrichment.transcription_id],
+        set_={
+            "status": "pending",
+            "retry_count": Enrichment.retry_count + 1,
+            "last_error": None,
+        },
+        where=(Enrichment.status == "error")
+    ).returning(Enrichment.id, Enrichment.status, Enrichment.retry_count)
+    
+    try:
+        row = session.execute(stmt).first()
+        session.commit()
+        invalidate_stats_cache()
+        return row
+    except Exception:
+        session.rollback()
+        raise
+
+
 def get_stats_summary(session):
     """
     Récupère un résumé des statistiques d'enrichissement.
@@ -333,6 +448,37 @@ def get_stats_summary(session):
     return stats
 
 
+def invalidate_stats_cache():
+    """Invalide le cache des statistiques (à appeler après une écriture)"""
+    _stats_cache["version"] += 1
+
+
+def get_stats_summary_cached(session):
+    """
+    Version mise en cache de get_stats_summary.
+    
+    Args:
+        session: Session SQLAlchemy
+        
+    Returns:
+        Dictionnaire de statistiques
+    """
+    if (
+        _stats_cache["cached_version"] == _stats_cache["version"]
+        and time.monotonic() < _stats_cache["expires"]
+    ):
+        return _stats_cache["value"]
+    
+    version = _stats_cache["version"]
+    stats = get_stats_summary(session)
+    _stats_cache.update(
+        cached_version=version,
+        expires=time.monotonic() + STATS_CACHE_TTL,
+        value=stats
+    )
+    return stats
+
+
 # Script de test
 if __name__ == "__main__":
     """Script de test pour créer les tables et vérifier le modèle"""
@@ -429,7 +429,7 @@ if __name__ == "__main__":
     print("="*60 + "\n")
     
     # Charger la config
-    config = EnrichmentConfig()
+    config = EnrichmentConfig.from_ini()
     
     # Texte de test
     test_text = """
@@ -10,6 +10,7 @@ import logging
 import time
 import signal
 import sys
+from dataclasses import replace
 from datetime import datetime
 from typing import Optional, List
 
@@ -347,9 +348,7 @@ def test_enrichment():
     logger.info(f"✅ Transcription de test créée: {test_id}")
     
     # Créer et tester le worker
-    config = EnrichmentConfig()
-    config.batch_size = 1
-    config.poll_interval_seconds = 1
+    config = replace(EnrichmentConfig.from_ini(), batch_size=1, poll_interval_seconds=1)
     
     worker = EnrichmentWorker(config)
     
@@ -393,7 +392,7 @@ def main():
     from logging_config import setup_logging
     
     # Charger la config
-    config = EnrichmentConfig()
+    config = EnrichmentConfig.from_ini()
     
     # Configurer les logs
     setup_logging(
@@ -11,15 +11,17 @@ from datetime import datetime
 
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import uvicorn
 
-from database import engine, Base
+from database import SessionLocal, init_db
 from api.enrichment_endpoints import router as enrichment_router
 from logging_config import setup_logging, get_uvicorn_log_config
 
 # ✅ Import des dépendances
 from enrichment.dependencies import get_enrichment_config
-from enrichment.engine import get_engine_state, EnrichmentEngineState
+from enrichment.engine import get_engine_state, run_enrichment_async, EnrichmentEngineState
+from enrichment.models import claim_pending_enrichments, get_stats_summary
 from enrichment.config import EnrichmentConfig
 
 logger = setup_logging(
@@ -27,8 +29,6 @@ logger = setup_logging(
     log_file="logs/enrichment.log"
 )
 
-Base.metadata.create_all(bind=engine)
-
 
 class ServiceState:
     """État du service (remplace les variables globales)"""
@@ -53,32 +53,23 @@ async def auto_enrichment_worker(
         config: Configuration passée explicitement
         engine_state: État du moteur passé explicitement
     """
-    from database import SessionLocal
-    from enrichment.models import Enrichment
-    from enrichment.engine import run_enrichment_async
-    
     logger.info(f"🚀 Worker démarré (batch={config.batch_size}, interval={config.poll_interval_seconds}s)")
     
     while service_state.is_running:
         try:
             db = SessionLocal()
-            
-            pending = (
-                db.query(Enrichment)
-                .filter(Enrichment.status == 'pending')
-                .order_by(Enrichment.created_at.asc())
-                .limit(config.batch_size)
-                .all()
-            )
-            
-            db.close()
+            try:
+                # Réservation atomique : plusieurs workers ne prennent jamais la même ligne
+                pending = claim_pending_enrichments(db, limit=config.batch_size)
+            finally:
+                db.close()
             
             if pending:
                 logger.info(f"📊 {len(pending)} enrichissement(s) en attente")
                 
                 tasks = [
-                    asyncio.create_task(run_enrichment_async(e.transcription_id))
-                    for e in pending
+                    asyncio.create_task(run_enrichment_async(transcription_id))
+                    for transcription_id in pending
                 ]
                 
                 results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -107,6 +98,8 @@ async def lifespan(app: FastAPI):
     logger.info("🎨 Démarrage service enrichissement")
     logger.info("=" * 60)
     
+    await init_db()
+    
     # ✅ Récupérer les dépendances localement
     config = get_enrichment_config()
     engine_state = get_engine_state()
@@ -163,6 +156,7 @@ app = FastAPI(
     title="Vocalyx Enrichment Service",
     description="Service sans variables globales (Clean Architecture)",
     version="1.1.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -194,10 +188,6 @@ def health_check(
     config: EnrichmentConfig = Depends(get_enrichment_config)  # ✅ Injection
 ):
     """Health check avec injection de dépendances"""
-    from enrichment.engine import get_engine_state
-    from enrichment.models import get_stats_summary
-    from database import SessionLocal
-    
     engine_state = get_engine_state()
     
     status = "healthy"
@@ -249,6 +239,8 @@ if __name__ == "__main__":
         "enrichment_service:app",
         host=args.host,
         port=args.port,
+        loop="uvloop",
+        http="httptools",
         reload=args.reload,
         log_config=get_uvicorn_log_config()
     )
\ No newline at end of file
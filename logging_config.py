@@ -5,14 +5,52 @@ Configuration centralisée du logging pour Vocalyx.
 Uniformise le format des logs pour tous les composants.
 """
 
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
 # Format uniforme pour tous les logs
 LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
 LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+# Thread d'écriture des logs (console + fichier hors du thread appelant)
+_queue_listener = None
+
+
+def _start_queue_listener(handlers):
+    """
+    Démarre un QueueListener qui écrit via `handlers` dans un thread dédié.
+    
+    Returns:
+        QueueHandler à attacher aux loggers
+    """
+    global _queue_listener
+    
+    stop_logging()
+    log_queue = queue.Queue(-1)
+    _queue_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
+    
+    # Le formatage final est fait par les handlers du listener
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    return queue_handler
+
+
+def stop_logging():
+    """Vide la file de logs et arrête le thread d'écriture"""
+    global _queue_listener
+    
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+atexit.register(stop_logging)
+
 
 def setup_logging(log_level: str = "INFO", log_file: str = None):
     """
@@ -43,13 +81,16 @@ def setup_logging(log_level: str = "INFO", log_file: str = None):
         log_path = Path(log_file)
         log_path.parent.mkdir(parents=True, exist_ok=True)
         
-        file_handler = logging.FileHandler(log_file)
+        file_handler = logging.FileHandler(log_file, delay=True)
         file_handler.setLevel(numeric_level)
         file_handler.setFormatter(
             logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
         )
         handlers.append(file_handler)
     
+    # Écriture asynchrone : les loggers ne font que déposer dans une file
+    handlers = [_start_queue_listener(handlers)]
+    
     # Configuration globale
     logging.basicConfig(
         level=numeric_level,
@@ -177,13 +218,15 @@ def setup_colored_logging(log_level: str = "INFO", log_file: str = None):
         log_path = Path(log_file)
         log_path.parent.mkdir(parents=True, exist_ok=True)
         
-        file_handler = logging.FileHandler(log_file)
+        file_handler = logging.FileHandler(log_file, delay=True)
         file_handler.setLevel(numeric_level)
         file_handler.setFormatter(
             logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
         )
         handlers.append(file_handler)
     
+    handlers = [_start_queue_listener(handlers)]
+    
     logging.basicConfig(
         level=numeric_level,
         format=LOG_FORMAT,
@@ -17,4 +17,18 @@ class TranscriptionResult(BaseModel):
     segments_count: Optional[int] = None
     vad_enabled: Optional[bool] = None
     created_at: Optional[str] = None
-    finished_at: Optional[str] = None
\ No newline at end of file
+    finished_at: Optional[str] = None
+
+class TranscriptionSummary(BaseModel):
+    """Vue allégée pour les listes (sans segments, texte tronqué)"""
+    id: str
+    status: str
+    language: Optional[str] = None
+    processing_time: Optional[float] = None
+    duration: Optional[float] = None
+    text: Optional[str] = None
+    error_message: Optional[str] = None
+    segments_count: Optional[int] = None
+    vad_enabled: Optional[bool] = None
+    created_at: Optional[str] = None
+    finished_at: Optional[str] = None
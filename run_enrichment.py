@@ -130,7 +130,7 @@ def main():
     # Charger la configuration
     print("⚙️  Chargement de la configuration...")
     try:
-        config = EnrichmentConfig()
+        config = EnrichmentConfig.from_ini()
         print("✅ Configuration chargée")
     except Exception as e:
         print(f"❌ Erreur lors du chargement de la config: {e}")
@@ -10,177 +10,203 @@ import sys
 import argparse
 from datetime import datetime, timedelta
 from pathlib import Path
-import configparser
 
-# Import des modèles depuis app.py
+# Modèles et moteur partagés avec le service (database.py)
 try:
-    from sqlalchemy import create_engine, func
+    from sqlalchemy import case, create_engine, delete, event, func, text
     from sqlalchemy.orm import sessionmaker
-    from app import Transcription, Base
+    from config import load_config
+    from database import SessionLocal, Transcription, engine, _set_sqlite_pragmas
+    import database
 except ImportError as e:
     print(f"❌ Error importing dependencies: {e}")
     print("Make sure you're running from the vocalyx directory")
     sys.exit(1)
 
 
+# Taille des lots de suppression (un commit par lot : journal et verrou d'écriture bornés)
+DELETE_BATCH_SIZE = 10_000
+
+
 class DatabaseCleaner:
     def __init__(self, config_file="config.ini", dry_run=False):
         self.dry_run = dry_run
-        self.config = self._load_config(config_file)
-        self.engine = create_engine(
-            self.config['database_path'],
-            connect_args={"check_same_thread": False}
-        )
-        Session = sessionmaker(bind=self.engine)
-        self.session = Session()
-    
-    def _load_config(self, config_file):
-        """Charge la configuration depuis config.ini"""
-        config = configparser.ConfigParser()
         if not Path(config_file).exists():
             print(f"⚠️  Config file not found: {config_file}")
-            print("Using default database path")
-            return {'database_path': 'sqlite:///./transcriptions.db'}
+            print(f"Using database from service config: {database.config.database_path}")
+            database_path = database.config.database_path
+        else:
+            database_path = load_config(config_file).database_path
         
-        config.read(config_file)
-        return {
-            'database_path': config.get('PATHS', 'database_path', 
-                                       fallback='sqlite:///./transcriptions.db')
-        }
+        if database_path == database.config.database_path:
+            # Même base que le service : pool et PRAGMAs SQLite de database.py
+            self.engine = engine
+            self.session = SessionLocal()
+        else:
+            self.engine = create_engine(
+                database_path,
+                connect_args={"check_same_thread": False} if database_path.startswith("sqlite") else {}
+            )
+            if database_path.startswith("sqlite"):
+                event.listen(self.engine, "connect", _set_sqlite_pragmas)
+            self.session = sessionmaker(bind=self.engine)()
     
     def get_stats(self):
-        """Obtient les statistiques de la base de données"""
-        total = self.session.query(Transcription).count()
+        """Obtient les statistiques de la base de données (une seule requête agrégée)"""
+        def count_status(status):
+            return func.coalesce(
+                func.sum(case((Transcription.status == status, 1), else_=0)), 0
+            )
+        
+        row = self.session.query(
+            func.count(Transcription.id),
+            count_status('pending'),
+            count_status('processing'),
+            count_status('done'),
+            count_status('error'),
+            func.min(Transcription.created_at),
+            func.max(Transcription.created_at),
+        ).one()
         
-        stats = {
-            'total': total,
-            'pending': self.session.query(Transcription).filter(
-                Transcription.status == 'pending'
-            ).count(),
-            'processing': self.session.query(Transcription).filter(
-                Transcription.status == 'processing'
-            ).count(),
-            'done': self.session.query(Transcription).filter(
-                Transcription.status == 'done'
-            ).count(),
-            'error': self.session.query(Transcription).filter(
-                Transcription.status == 'error'
-            ).count(),
+        return {
+            'total': row[0],
+            'pending': row[1],
+            'processing': row[2],
+            'done': row[3],
+            'error': row[4],
+            # Plus ancienne et plus récente (None si la table est vide)
+            'oldest_date': row[5],
+            'newest_date': row[6],
         }
-        
-        # Plus ancienne et plus récente
-        if total > 0:
-            oldest = self.session.query(Transcription).order_by(
-                Transcription.created_at.asc()
-            ).first()
-            newest = self.session.query(Transcription).order_by(
-                Transcription.created_at.desc()
-            ).first()
-            
-            stats['oldest_date'] = oldest.created_at
-            stats['newest_date'] = newest.created_at
-        else:
-            stats['oldest_date'] = None
-            stats['newest_date'] = None
-        
-        return stats
+    
+    def _delete_in_batches(self, query):
+        """Supprime les lignes de la requête par lots de DELETE_BATCH_SIZE"""
+        batch_ids = query.with_entities(Transcription.id).limit(DELETE_BATCH_SIZE).scalar_subquery()
+        # Instruction DELETE construite une fois, sans synchronisation de l'identity map
+        stmt = delete(Transcription).where(
+            Transcription.id.in_(batch_ids)
+        ).execution_options(synchronize_session=False)
+        total = 0
+        while True:
+            deleted = self.session.execute(stmt).rowcount
+            self.session.commit()
+            if not deleted:
+                return total
+            total += deleted
+            print(f"   🗑️  {total} deleted...")
     
     def cleanup_old(self, days=30):
         """Supprime les transcriptions plus anciennes que X jours"""
         cutoff_date = datetime.utcnow() - timedelta(days=days)
-        
-        old_entries = self.session.query(Transcription).filter(
+        query = self.session.query(Transcription).filter(
             Transcription.created_at < cutoff_date
-        ).all()
+        )
+        
+        # Répartition par statut calculée en SQL (aucune ligne chargée)
+        by_status = dict(
+            query.with_entities(Transcription.status, func.count())
+            .group_by(Transcription.status)
+            .all()
+        )
+        total = sum(by_status.values())
         
-        if not old_entries:
+        if not total:
             print(f"✅ No transcriptions older than {days} days")
             return 0
         
-        print(f"\n📊 Found {len(old_entries)} transcriptions older than {days} days:")
-        
-        # Grouper par statut
-        by_status = {}
-        for entry in old_entries:
-            status = entry.status or 'unknown'
-            by_status[status] = by_status.get(status, 0) + 1
+        print(f"\n📊 Found {total} transcriptions older than {days} days:")
         
         for status, count in by_status.items():
-            print(f"   - {status}: {count}")
+            print(f"   - {status or 'unknown'}: {count}")
         
         if self.dry_run:
-            print(f"\n🔍 DRY RUN: Would delete {len(old_entries)} entries")
-            return len(old_entries)
-        
-        # Suppression
-        for entry in old_entries:
-            self.session.delete(entry)
+            print(f"\n🔍 DRY RUN: Would delete {total} entries")
+            return total
         
-        self.session.commit()
-        print(f"\n✅ Deleted {len(old_entries)} old transcriptions")
-        return len(old_entries)
+        # Suppression par lots
+        deleted = self._delete_in_batches(query)
+        print(f"\n✅ Deleted {deleted} old transcriptions")
+        return deleted
     
     def cleanup_by_status(self, status='error'):
         """Supprime les transcriptions par statut"""
-        entries = self.session.query(Transcription).filter(
+        query = self.session.query(Transcription).filter(
             Transcription.status == status
-        ).all()
+        )
+        total = query.count()
         
-        if not entries:
+        if not total:
             print(f"✅ No transcriptions with status '{status}'")
             return 0
         
-        print(f"\n📊 Found {len(entries)} transcriptions with status '{status}'")
+        print(f"\n📊 Found {total} transcriptions with status '{status}'")
         
         if self.dry_run:
-            print(f"\n🔍 DRY RUN: Would delete {len(entries)} entries")
-            return len(entries)
+            print(f"\n🔍 DRY RUN: Would delete {total} entries")
+            return total
         
-        for entry in entries:
-            self.session.delete(entry)
-        
-        self.session.commit()
-        print(f"\n✅ Deleted {len(entries)} transcriptions")
-        return len(entries)
+        deleted = self._delete_in_batches(query)
+        print(f"\n✅ Deleted {deleted} transcriptions")
+        return deleted
     
     def cleanup_incomplete(self):
         """Supprime les transcriptions incomplètes (pending/processing depuis >1h)"""
         cutoff_date = datetime.utcnow() - timedelta(hours=1)
         
-        entries = self.session.query(Transcription).filter(
+        query = self.session.query(Transcription).filter(
             Transcription.status.in_(['pending', 'processing']),
             Transcription.created_at < cutoff_date
-        ).all()
+        )
         
-        if not entries:
+        total = query.count()
+        
+        if not total:
             print("✅ No stuck transcriptions")
             return 0
         
-        print(f"\n📊 Found {len(entries)} stuck transcriptions:")
+        print(f"\n📊 Found {total} stuck transcriptions:")
+        # Colonnes affichées uniquement, lues par paquets (pas de liste complète en mémoire)
+        entries = query.with_entities(
+            Transcription.id, Transcription.status, Transcription.created_at
+        ).yield_per(1000)
+        now = datetime.utcnow()
         for entry in entries:
-            age = datetime.utcnow() - entry.created_at
+            age = now - entry.created_at
             print(f"   - {entry.id}: {entry.status} (age: {age})")
         
         if self.dry_run:
-            print(f"\n🔍 DRY RUN: Would delete {len(entries)} entries")
-            return len(entries)
-        
-        for entry in entries:
-            self.session.delete(entry)
+            print(f"\n🔍 DRY RUN: Would delete {total} entries")
+            return total
         
-        self.session.commit()
-        print(f"\n✅ Deleted {len(entries)} stuck transcriptions")
-        return len(entries)
+        deleted = self._delete_in_batches(query)
+        print(f"\n✅ Deleted {deleted} stuck transcriptions")
+        return deleted
     
-    def vacuum(self):
-        """Optimise la base de données (SQLite VACUUM)"""
+    def vacuum(self, full=False):
+        """
+        Libère l'espace des pages supprimées (SQLite).
+        Par défaut incremental_vacuum (pages libres uniquement) ;
+        full=True réécrit tout le fichier (VACUUM, verrou exclusif).
+        """
         if self.dry_run:
-            print("🔍 DRY RUN: Would run VACUUM")
+            print(f"🔍 DRY RUN: Would run {'VACUUM' if full else 'incremental VACUUM'}")
             return
         
-        print("\n🔧 Running VACUUM to reclaim space...")
-        self.session.execute("VACUUM")
+        # VACUUM est refusé dans une transaction ouverte
         self.session.commit()
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if full:
+                print("\n🔧 Running VACUUM to reclaim space...")
+                # Le mode incrémental est appliqué par la réécriture complète
+                conn.execute(text("PRAGMA auto_vacuum=INCREMENTAL"))
+                conn.execute(text("VACUUM"))
+            elif conn.execute(text("PRAGMA auto_vacuum")).scalar() != 2:
+                print("⚠️  auto_vacuum is not INCREMENTAL on this database: run once with --full-vacuum")
+                return
+            else:
+                print("\n🔧 Running incremental VACUUM (freed pages only)...")
+                # executescript exécute le PRAGMA jusqu'au bout (execute ne libère qu'une page)
+                conn.connection.driver_connection.executescript("PRAGMA incremental_vacuum;")
         print("✅ Database optimized")
     
     def print_stats(self):
@@ -231,6 +257,9 @@ Examples:
   # Tout nettoyer + optimiser
   python cleanup_db.py --days 30 --incomplete --vacuum
   
+  # Réécriture complète (une fois, active le vacuum incrémental)
+  python cleanup_db.py --full-vacuum
+  
   # Mode dry-run (simulation)
   python cleanup_db.py --days 30 --dry-run
   
@@ -250,7 +279,9 @@ Examples:
     parser.add_argument('--incomplete', action='store_true',
                        help='Delete stuck transcriptions (pending/processing > 1h)')
     parser.add_argument('--vacuum', action='store_true',
-                       help='Optimize database (reclaim space)')
+                       help='Reclaim freed pages (incremental vacuum)')
+    parser.add_argument('--full-vacuum', action='store_true',
+                       help='Rewrite the whole database file (VACUUM, exclusive lock)')
     parser.add_argument('--dry-run', action='store_true',
                        help='Show what would be deleted without actually deleting')
     parser.add_argument('-y', '--yes', action='store_true',
@@ -259,7 +290,7 @@ Examples:
     args = parser.parse_args()
     
     # Au moins une action requise
-    if not any([args.stats, args.days, args.status, args.incomplete, args.vacuum]):
+    if not any([args.stats, args.days, args.status, args.incomplete, args.vacuum, args.full_vacuum]):
         parser.print_help()
         return
     
@@ -303,8 +334,10 @@ Examples:
             deleted = cleaner.cleanup_incomplete()
             total_deleted += deleted
         
-        # Vacuum
-        if args.vacuum and total_deleted > 0:
+        # Vacuum (complet : aussi sans suppression, ex. pour activer auto_vacuum)
+        if args.full_vacuum:
+            cleaner.vacuum(full=True)
+        elif args.vacuum and total_deleted > 0:
             cleaner.vacuum()
         
         # Stats finales si nettoyage effectué
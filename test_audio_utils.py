@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+test_audio_utils.py
+
+Script de test du découpage audio (VAD numpy et découpe en mémoire).
+Vérifie sur un signal synthétique (ton / silence) les plages détectées
+et les couples (échantillons, décalage) utilisés pour horodater les segments.
+"""
+
+import sys
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def print_section(title: str):
+    """Affiche un titre de section"""
+    print("\n" + "="*70)
+    print(f"  {title}")
+    print("="*70 + "\n")
+
+
+def build_signal(parts, sample_rate: int) -> np.ndarray:
+    """Concatène des parties (type, durée en ms) : 'tone' = sinus 440 Hz, 'silence' = zéros"""
+    chunks = []
+    for kind, duration_ms in parts:
+        n = sample_rate * duration_ms // 1000
+        if kind == "tone":
+            t = np.arange(n, dtype=np.float32) / sample_rate
+            chunks.append((0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32))
+        else:
+            chunks.append(np.zeros(n, dtype=np.float32))
+    return np.concatenate(chunks)
+
+
+def test_detect_speech_segments():
+    """Test 1: Plages de parole détectées par le VAD"""
+    print_section("TEST 1: detect_speech_segments")
+
+    try:
+        from transcribe.audio_utils import SAMPLE_RATE, VAD_FRAME_MS, config, detect_speech_segments
+
+        # Silences alignés sur les trames : l'un coupe la parole, l'autre non
+        min_silence = config.vad_min_silence_len
+        short_gap = max(VAD_FRAME_MS, (min_silence // 2) // VAD_FRAME_MS * VAD_FRAME_MS)
+        long_gap = (min_silence // VAD_FRAME_MS + 1) * VAD_FRAME_MS * 2
+
+        parts = [
+            ("silence", 1000),
+            ("tone", 2000),
+            ("silence", long_gap),
+            ("tone", 1000),
+            ("silence", short_gap),
+            ("tone", 1000),
+            ("silence", 1000),
+        ]
+        samples = build_signal(parts, SAMPLE_RATE)
+
+        second_start = 1000 + 2000 + long_gap
+        expected = [
+            (1000, 3000),
+            (second_start, second_start + 1000 + short_gap + 1000),
+        ]
+
+        segments = detect_speech_segments(samples)
+        print(f"   • Attendu: {expected}")
+        print(f"   • Obtenu:  {segments}")
+        assert segments == expected, f"{segments} != {expected}"
+
+        # Silence complet : tout l'audio est conservé
+        silence = np.zeros(SAMPLE_RATE * 2, dtype=np.float32)
+        assert detect_speech_segments(silence) == [(0, 2000)]
+
+        print("   ✅ Plages de parole correctes")
+        return True
+
+    except Exception as e:
+        logger.exception(f"❌ Erreur: {e}")
+        return False
+
+
+def test_split_audio_intelligent():
+    """Test 2: Couples (échantillons, décalage) renvoyés par la découpe"""
+    print_section("TEST 2: split_audio_intelligent")
+
+    try:
+        from transcribe.audio_utils import SAMPLE_RATE, config, split_audio_intelligent
+
+        # > 60 s pour déclencher la découpe ; silences de 5 s (> 2 s : segments séparés)
+        parts = [
+            ("silence", 10000),
+            ("tone", 30000),
+            ("silence", 5000),
+            ("tone", 25000),
+            ("silence", 2000),
+        ]
+        samples = build_signal(parts, SAMPLE_RATE)
+        per_ms = SAMPLE_RATE // 1000
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            wav_path = Path(tmp_dir) / "synthetic.wav"
+            sf.write(str(wav_path), samples, SAMPLE_RATE, subtype="FLOAT")
+
+            # Découpe par durée (sans VAD) : 72 s -> 2 moitiés
+            halves = split_audio_intelligent(wav_path, use_vad=False)
+            print(f"   • Sans VAD: {[(len(s), offset) for s, offset in halves]}")
+            assert [offset for _, offset in halves] == [0.0, 36.0]
+            assert np.array_equal(halves[0][0], samples[:36000 * per_ms])
+            assert np.array_equal(halves[1][0], samples[36000 * per_ms:72000 * per_ms])
+
+            # Découpe VAD : chaque segment démarre au début de sa plage de parole
+            if config.vad_enabled:
+                segments = split_audio_intelligent(wav_path, use_vad=True)
+                print(f"   • Avec VAD: {[(len(s), offset) for s, offset in segments]}")
+                assert [offset for _, offset in segments] == [10.0, 45.0]
+                assert np.array_equal(segments[0][0], samples[10000 * per_ms:40000 * per_ms])
+                assert np.array_equal(segments[1][0], samples[45000 * per_ms:70000 * per_ms])
+            else:
+                print("   ⚠️  VAD désactivé dans config.ini : découpe VAD non testée")
+
+        print("   ✅ Échantillons et décalages corrects")
+        return True
+
+    except Exception as e:
+        logger.exception(f"❌ Erreur: {e}")
+        return False
+
+
+def main():
+    """Lance tous les tests"""
+    results = {
+        'VAD': test_detect_speech_segments(),
+        'Split': test_split_audio_intelligent(),
+    }
+
+    # Résumé
+    print_section("RÉSUMÉ DES TESTS")
+
+    passed = sum(1 for v in results.values() if v)
+    for test_name, success in results.items():
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"   {status}  {test_name}")
+
+    print(f"\n📊 Résultats: {passed}/{len(results)} tests réussis")
+    return passed == len(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
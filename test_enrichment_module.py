@@ -35,7 +35,7 @@ def test_config():
         from enrichment.config import EnrichmentConfig
         
         print("📝 Chargement de la configuration...")
-        config = EnrichmentConfig()
+        config = EnrichmentConfig.from_ini()
         
         print(f"   ✅ Config chargée")
         print(f"   • Modèle: {config.model_path}")
@@ -7,6 +7,9 @@ from .transcription import (
     initialize_whisper_model,
     cleanup_resources,
     run_transcription_optimized,
+    start_transcription_workers,
+    enqueue_transcription,
+    is_queue_full,
     whisper_model
 )
 
@@ -22,6 +25,9 @@ __all__ = [
     'initialize_whisper_model',
     'cleanup_resources',
     'run_transcription_optimized',
+    'start_transcription_workers',
+    'enqueue_transcription',
+    'is_queue_full',
     'whisper_model',
     'sanitize_filename',
     'get_audio_duration',
@@ -3,19 +3,26 @@ Utilitaires pour le traitement audio
 """
 
 import logging
+import av
+import numpy as np
 import soundfile as sf
 from pathlib import Path
 from typing import List, Tuple
 
 from pydub import AudioSegment
 from pydub.effects import normalize
-from pydub.silence import detect_nonsilent
 
-from config import Config
+from config import load_config
 
-config = Config()
+config = load_config()
 logger = logging.getLogger(__name__)
 
+# Fréquence attendue par Whisper
+SAMPLE_RATE = 16000
+
+# Taille des trames d'analyse du VAD
+VAD_FRAME_MS = 20
+
 def sanitize_filename(filename: str) -> str:
     """Nettoie le nom de fichier"""
     return "".join(c for c in filename if c.isalnum() or c in "._-")
@@ -24,24 +31,48 @@ def get_audio_duration(file_path: Path) -> float:
     """
     Obtient la durée réelle de l'audio en secondes.
     FIXE: Utilise soundfile pour une mesure précise.
+    Les formats compressés (mp3, m4a, ...) sont lus via l'en-tête du conteneur (PyAV) ;
+    le décodage complet par pydub n'est qu'un dernier recours.
     """
     try:
         info = sf.info(str(file_path))
         return round(info.duration, 2)
     except Exception as e:
-        logger.warning(f"⚠️ Could not get duration with soundfile: {e}")
-        # Fallback avec pydub
-        try:
-            audio = AudioSegment.from_file(str(file_path))
-            return round(len(audio) / 1000.0, 2)
-        except Exception as e2:
-            logger.error(f"❌ Could not get duration: {e2}")
-            return 0.0
+        logger.debug(f"soundfile cannot read {file_path.name}: {e}")
+    
+    try:
+        with av.open(str(file_path)) as container:
+            if container.duration:
+                return round(container.duration / av.time_base, 2)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not get duration from container header: {e}")
+    
+    # Fallback avec pydub (décodage complet)
+    try:
+        audio = AudioSegment.from_file(str(file_path))
+        return round(len(audio) / 1000.0, 2)
+    except Exception as e:
+        logger.error(f"❌ Could not get duration: {e}")
+        return 0.0
 
 def preprocess_audio(audio_path: Path) -> Path:
     """
     Pré-traite l'audio pour améliorer la qualité de transcription.
+    Un WAV PCM déjà en mono 16kHz est utilisé tel quel (pas de décodage/ré-encodage).
     """
+    try:
+        info = sf.info(str(audio_path))
+        if (
+            info.format == "WAV"
+            and info.subtype.startswith("PCM")
+            and info.samplerate == 16000
+            and info.channels == 1
+        ):
+            logger.info(f"⏩ Audio already 16kHz mono PCM, preprocessing skipped: {audio_path.name}")
+            return audio_path
+    except Exception:
+        pass  # Format non lisible par soundfile (mp3, m4a...) : passage par pydub
+    
     try:
         audio = AudioSegment.from_file(str(audio_path))
         
@@ -61,93 +92,112 @@ def preprocess_audio(audio_path: Path) -> Path:
         logger.warning(f"⚠️ Preprocessing failed, using original: {e}")
         return audio_path
 
-def detect_speech_segments(audio_path: Path) -> List[Tuple[int, int]]:
+def detect_speech_segments(samples: np.ndarray) -> List[Tuple[int, int]]:
     """
-    Détecte les segments de parole (VAD).
+    Détecte les segments de parole (VAD) par seuil d'énergie RMS sur des trames de 20 ms.
     Retourne une liste de (start_ms, end_ms) des segments avec de la parole.
     """
+    duration_ms = len(samples) * 1000 // SAMPLE_RATE
     try:
-        audio = AudioSegment.from_file(str(audio_path))
+        frame = SAMPLE_RATE * VAD_FRAME_MS // 1000
+        n_frames = len(samples) // frame
+        if n_frames == 0:
+            return [(0, duration_ms)]
         
-        speech_segments = detect_nonsilent(
-            audio,
-            min_silence_len=config.vad_min_silence_len,
-            silence_thresh=config.vad_silence_thresh
-        )
+        frames = samples[:n_frames * frame].reshape(n_frames, frame)
+        rms = np.sqrt(np.einsum("ij,ij->i", frames, frames) / frame)
+        voiced = rms > 10 ** (config.vad_silence_thresh / 20)
         
-        if not speech_segments:
-            return [(0, len(audio))]
+        if not voiced.any():
+            return [(0, duration_ms)]
         
+        # Bornes des séquences de trames voisées
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], voiced.astype(np.int8), [0]))))
+        starts, ends = edges[0::2], edges[1::2]
+        
+        # Les silences plus courts que min_silence_len ne coupent pas la parole
+        long_gaps = (starts[1:] - ends[:-1]) * VAD_FRAME_MS >= config.vad_min_silence_len
+        starts = np.concatenate((starts[:1], starts[1:][long_gaps]))
+        ends = np.concatenate((ends[:-1][long_gaps], ends[-1:]))
+        
+        speech_segments = [
+            (int(start) * VAD_FRAME_MS, int(end) * VAD_FRAME_MS)
+            for start, end in zip(starts, ends)
+        ]
         logger.info(f"🎤 VAD: Detected {len(speech_segments)} speech segments")
         return speech_segments
     except Exception as e:
         logger.warning(f"⚠️ VAD failed, using full audio: {e}")
-        audio = AudioSegment.from_file(str(audio_path))
-        return [(0, len(audio))]
+        return [(0, duration_ms)]
 
-def split_audio_intelligent(file_path: Path, use_vad: bool = True) -> List[Path]:
+def load_audio_array(file_path: Path) -> np.ndarray:
     """
-    Découpe l'audio de manière intelligente.
+    Charge l'audio en mémoire : float32 mono 16kHz (format d'entrée de Whisper).
     """
-    segment_paths = []
-    audio = AudioSegment.from_file(str(file_path))
-    duration_ms = len(audio)
+    try:
+        samples, sample_rate = sf.read(str(file_path), dtype="float32", always_2d=False)
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1, dtype=np.float32)
+        if sample_rate == SAMPLE_RATE:
+            return samples
+    except Exception as e:
+        logger.warning(f"⚠️ soundfile could not read {file_path.name}, decoding with pydub: {e}")
+    
+    # Format non WAV ou mauvaise fréquence : décodage/rééchantillonnage via pydub
+    audio = AudioSegment.from_file(str(file_path)).set_channels(1).set_frame_rate(SAMPLE_RATE)
+    samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
+    return samples / float(1 << (8 * audio.sample_width - 1))
+
+def split_audio_intelligent(file_path: Path, use_vad: bool = True) -> List[Tuple[np.ndarray, float]]:
+    """
+    Découpe l'audio de manière intelligente, en mémoire.
+    Retourne une liste de (échantillons, décalage en secondes).
+    """
+    samples = load_audio_array(file_path)
+    samples_per_ms = SAMPLE_RATE // 1000
+    duration_ms = len(samples) // samples_per_ms
     duration_s = duration_ms / 1000
     
-    try:
-        # Audio court: pas de découpe
-        if duration_s < 60:
-            logger.info(f"📊 Audio court ({duration_s:.1f}s), pas de découpe")
-            return [file_path]
-        
-        # VAD activé: découper selon les segments de parole
-        if use_vad and config.vad_enabled:
-            speech_segments = detect_speech_segments(file_path)
-            
-            # Grouper les segments proches (< 2s d'écart)
-            merged_segments = []
-            current_start, current_end = speech_segments[0]
-            
-            for start, end in speech_segments[1:]:
-                if start - current_end < 2000:
-                    current_end = end
-                else:
-                    merged_segments.append((current_start, current_end))
-                    current_start, current_end = start, end
-            merged_segments.append((current_start, current_end))
-            
-            # Exporter les segments
-            for i, (start_ms, end_ms) in enumerate(merged_segments):
-                segment = audio[start_ms:end_ms]
-                segment_path = file_path.parent / f"{file_path.stem}_vad{i}.wav"
-                segment.export(str(segment_path), format="wav")
-                segment_paths.append(segment_path)
-            
-            logger.info(f"🎯 VAD: Created {len(segment_paths)} optimized segments")
-            return segment_paths
+    def _slice(start_ms: int, end_ms: int) -> Tuple[np.ndarray, float]:
+        return samples[start_ms * samples_per_ms:end_ms * samples_per_ms], start_ms / 1000
+    
+    # Audio court: pas de découpe
+    if duration_s < 60:
+        logger.info(f"📊 Audio court ({duration_s:.1f}s), pas de découpe")
+        return [(samples, 0.0)]
+    
+    # VAD activé: découper selon les segments de parole
+    if use_vad and config.vad_enabled:
+        speech_segments = detect_speech_segments(samples)
         
-        # Découpe classique par durée
-        if duration_s < 180:
-            # Audio moyen: découper en 2
-            mid = duration_ms // 2
-            for i, (start, end) in enumerate([(0, mid), (mid, duration_ms)]):
-                segment = audio[start:end]
-                segment_path = file_path.parent / f"{file_path.stem}_seg{i}.wav"
-                segment.export(str(segment_path), format="wav")
-                segment_paths.append(segment_path)
-            logger.info(f"📊 Audio moyen ({duration_s:.1f}s), découpe en 2")
-        else:
-            # Audio long: découper par segments configurables
-            for i, start_ms in enumerate(range(0, duration_ms, config.segment_length_ms)):
-                segment = audio[start_ms:start_ms + config.segment_length_ms]
-                segment_path = file_path.parent / f"{file_path.stem}_seg{i}.wav"
-                segment.export(str(segment_path), format="wav")
-                segment_paths.append(segment_path)
-            logger.info(f"📊 Audio long ({duration_s:.1f}s), découpe en {len(segment_paths)}")
+        # Grouper les segments proches (< 2s d'écart)
+        merged_segments = []
+        current_start, current_end = speech_segments[0]
         
-        return segment_paths
+        for start, end in speech_segments[1:]:
+            if start - current_end < 2000:
+                current_end = end
+            else:
+                merged_segments.append((current_start, current_end))
+                current_start, current_end = start, end
+        merged_segments.append((current_start, current_end))
         
-    except Exception as e:
-        for seg_path in segment_paths:
-            seg_path.unlink(missing_ok=True)
-        raise e
\ No newline at end of file
+        segments = [_slice(start_ms, end_ms) for start_ms, end_ms in merged_segments]
+        logger.info(f"🎯 VAD: Created {len(segments)} optimized segments")
+        return segments
+    
+    # Découpe classique par durée
+    if duration_s < 180:
+        # Audio moyen: découper en 2
+        mid = duration_ms // 2
+        segments = [_slice(0, mid), _slice(mid, duration_ms)]
+        logger.info(f"📊 Audio moyen ({duration_s:.1f}s), découpe en 2")
+    else:
+        # Audio long: découper par segments configurables
+        segments = [
+            _slice(start_ms, start_ms + config.segment_length_ms)
+            for start_ms in range(0, duration_ms, config.segment_length_ms)
+        ]
+        logger.info(f"📊 Audio long ({duration_s:.1f}s), découpe en {len(segments)}")
+    
+    return segments
@@ -5,46 +5,133 @@ Fonctions de transcription audio
 import asyncio
 import concurrent.futures
 import gc
-import json
 import logging
+import os
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Set, Tuple
 
+import ctranslate2
+import numpy as np
 from faster_whisper import WhisperModel
 
-from config import Config
+from sqlalchemy import select, update
+
+from config import load_config
 from database import SessionLocal, Transcription
 from transcribe.audio_utils import get_audio_duration, preprocess_audio, split_audio_intelligent
 
-config = Config()
+config = load_config()
 logger = logging.getLogger(__name__)
 
+# Déclenchement HTTP de l'enrichissement en fin de transcription (opt-in)
+ENRICHMENT_AUTO_TRIGGER = os.getenv("ENRICHMENT_AUTO_TRIGGER", "false").lower() == "true"
+
 # Variables globales
 whisper_model = None
 executor = None
+transcription_queue: Optional[asyncio.Queue] = None
+queue_workers: List[asyncio.Task] = []
+# Références fortes des déclenchements d'enrichissement en cours
+# (la boucle ne garde que des références faibles sur les tâches)
+_background_tasks: Set[asyncio.Task] = set()
+
+# Borne le nombre de transcriptions en cours (audio décodé, session DB),
+# y compris pour les appels directs qui ne passent pas par la file
+TRANSCRIPTION_SEM = asyncio.Semaphore(config.max_workers)
+
+def resolve_compute_target() -> Tuple[str, str, int]:
+    """
+    Résout les valeurs 'auto' selon le matériel détecté par CTranslate2.
+    Retourne: (device, compute_type, cpu_threads)
+    """
+    device = config.device
+    if device == "auto":
+        device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    
+    compute_type = config.compute_type
+    if compute_type == "auto":
+        # int8 pour les poids ; float16 pour les activations sur GPU
+        preferred = ("int8_float16", "float16", "int8") if device == "cuda" else ("int8", "float32")
+        supported = ctranslate2.get_supported_compute_types(device)
+        compute_type = next((ct for ct in preferred if ct in supported), "default")
+    
+    # 0 = un thread par cœur physique (les hyperthreads n'accélèrent pas l'inférence)
+    cpu_threads = config.cpu_threads or max(1, (os.cpu_count() or 2) // 2)
+    return device, compute_type, cpu_threads
 
 async def initialize_whisper_model():
     """Initialise le modèle Whisper"""
     global whisper_model, executor
     
-    logger.info(f"🚀 Loading Whisper model: {config.model} on {config.device}")
+    device, compute_type, cpu_threads = resolve_compute_target()
+    logger.info(
+        f"🚀 Loading Whisper model: {config.model} on {device} "
+        f"({compute_type}, {cpu_threads} threads)"
+    )
     whisper_model = WhisperModel(
         config.model,
-        device=config.device,
-        compute_type=config.compute_type,
-        cpu_threads=config.cpu_threads
+        device=device,
+        compute_type=compute_type,
+        cpu_threads=cpu_threads
     )
     
-    executor = concurrent.futures.ThreadPoolExecutor(max_workers=config.max_workers)
+    # Un seul thread d'inférence : CTranslate2 parallélise déjà sur cpu_threads,
+    # des appels concurrents se disputeraient les mêmes cœurs
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="whisper")
     logger.info(f"✅ Whisper loaded | VAD: {config.vad_enabled} | Workers: {config.max_workers}")
 
+async def _transcription_consumer(worker_id: int):
+    """Consomme la file de transcriptions (une tâche à la fois par worker)"""
+    while True:
+        transcription_id, file_path, translate, use_vad = await transcription_queue.get()
+        try:
+            await run_transcription_optimized(transcription_id, file_path, translate, use_vad)
+        except Exception as e:
+            logger.exception(f"[{transcription_id}] ❌ Worker {worker_id} error: {e}")
+        finally:
+            transcription_queue.task_done()
+
+async def start_transcription_workers():
+    """Démarre la file bornée et ses consommateurs (max_workers jobs simultanés)"""
+    global transcription_queue, queue_workers
+    
+    transcription_queue = asyncio.Queue(maxsize=config.max_queue_size)
+    queue_workers = [
+        asyncio.create_task(_transcription_consumer(i))
+        for i in range(config.max_workers)
+    ]
+    logger.info(f"📬 Transcription queue ready | Consumers: {config.max_workers} | Max pending: {config.max_queue_size}")
+
+QUEUE_FULL_MESSAGE = "Transcription queue is full. Please retry later."
+
+def is_queue_full() -> bool:
+    """Indique si la file de transcriptions est saturée"""
+    return transcription_queue is not None and transcription_queue.full()
+
+def enqueue_transcription(
+    transcription_id: str,
+    file_path: Path,
+    translate: bool,
+    use_vad: bool = True
+) -> bool:
+    """Ajoute une transcription à la file de traitement (False si la file est pleine, sans attendre)"""
+    try:
+        transcription_queue.put_nowait((transcription_id, file_path, translate, use_vad))
+    except asyncio.QueueFull:
+        return False
+    return True
+
 async def cleanup_resources():
     """Nettoie les ressources"""
-    global whisper_model, executor
+    global whisper_model, executor, queue_workers
     
     try:
+        for task in queue_workers:
+            task.cancel()
+        queue_workers = []
+        
         logger.info("🛑 Releasing Whisper model resources...")
         whisper_model = None
         gc.collect()
@@ -56,9 +143,14 @@ async def cleanup_resources():
     except Exception as e:
         logger.warning(f"⚠️ Error while cleaning up resources: {e}")
 
-def transcribe_segment(file_path: Path, translate: bool = False) -> tuple:
+def transcribe_segment(
+    audio: np.ndarray,
+    translate: bool = False,
+    condition_on_previous_text: bool = False
+) -> tuple:
     """
-    Transcrit un segment audio.
+    Transcrit un segment audio (échantillons float32 mono 16kHz).
+    Le contexte du texte précédent ne sert que sur un audio non découpé.
     Retourne: (text, segments_list, detected_language)
     """
     global whisper_model
@@ -67,14 +159,14 @@ def transcribe_segment(file_path: Path, translate: bool = False) -> tuple:
         raise RuntimeError("Whisper model not loaded")
     
     segments_list = []
-    text_full = ""
+    text_parts = []
     
     segments, info = whisper_model.transcribe(
-        str(file_path),
+        audio,
         language=config.language,
         task="translate" if translate else "transcribe",
         beam_size=config.beam_size,
-        best_of=config.beam_size,
+        best_of=config.best_of,
         temperature=config.temperature,
         vad_filter=True,
         vad_parameters=dict(
@@ -83,7 +175,7 @@ def transcribe_segment(file_path: Path, translate: bool = False) -> tuple:
             min_silence_duration_ms=config.vad_min_silence_duration_ms
         ),
         word_timestamps=False,
-        condition_on_previous_text=True,
+        condition_on_previous_text=condition_on_previous_text,
     )
     
     for seg in segments:
@@ -92,9 +184,14 @@ def transcribe_segment(file_path: Path, translate: bool = False) -> tuple:
             "end": round(seg.end, 2),
             "text": seg.text.strip()
         })
-        text_full += seg.text.strip() + " "
+        text_parts.append(seg.text.strip())
     
-    return text_full.strip(), segments_list, info.language
+    return " ".join(text_parts).strip(), segments_list, info.language
+
+def transcribe_all(audio_segments: List[Tuple[np.ndarray, float]], translate: bool = False) -> List[tuple]:
+    """Transcrit les segments l'un après l'autre sur le modèle partagé"""
+    single = len(audio_segments) == 1
+    return [transcribe_segment(samples, translate, single) for samples, _ in audio_segments]
 
 async def run_transcription_optimized(
     transcription_id: str,
@@ -102,102 +199,117 @@ async def run_transcription_optimized(
     translate: bool,
     use_vad: bool = True
 ):
-    """Transcription optimisée avec durée correcte"""
-    db = SessionLocal()
-    entry = db.query(Transcription).filter(Transcription.id == transcription_id).first()
-    if not entry:
-        db.close()
-        return
-
-    entry.status = "processing"
-    entry.vad_enabled = 1 if use_vad else 0
-    
-    db.commit()
+    """Transcription optimisée avec durée correcte (max_workers simultanées)"""
+    async with TRANSCRIPTION_SEM:
+        await _run_transcription(transcription_id, file_path, translate, use_vad)
+
+async def _run_transcription(
+    transcription_id: str,
+    file_path: Path,
+    translate: bool,
+    use_vad: bool
+):
+    with SessionLocal() as db:
+        # Ligne "pending" créée à l'upload (vad_enabled déjà renseigné) :
+        # UPDATE direct, sans relire la ligne ; 0 ligne = supprimée entre-temps
+        by_id = update(Transcription).where(Transcription.id == transcription_id)
+        if db.execute(by_id.values(status="processing")).rowcount == 0:
+            # Supprimée pendant l'attente en file : l'upload ne sera jamais traité
+            file_path.unlink(missing_ok=True)
+            return
+        db.commit()
     
-    segment_paths = []
-    processed_path = None
+        processed_path = None
 
-    try:
-        start_time = time.time()
+        try:
+            start_time = time.time()
+            loop = asyncio.get_running_loop()
         
-        # 1. Obtenir la durée RÉELLE de l'audio original
-        original_duration = get_audio_duration(file_path)
-        logger.info(f"[{transcription_id}] 📏 Original audio duration: {original_duration}s")
+            # Le décodage/la découpe pydub sont CPU-bound : exécutés hors de la
+            # boucle d'événements (executor par défaut, le pool Whisper reste libre)
         
-        # 2. Pré-traitement audio
-        processed_path = preprocess_audio(file_path)
+            # 1. Obtenir la durée RÉELLE de l'audio original
+            original_duration = await loop.run_in_executor(None, get_audio_duration, file_path)
+            logger.info(f"[{transcription_id}] 📏 Original audio duration: {original_duration}s")
         
-        # 3. Découpe intelligente
-        segment_paths = split_audio_intelligent(processed_path, use_vad=use_vad)
-        logger.info(f"[{transcription_id}] 🔪 Created {len(segment_paths)} segments")
-
-        # 4. Transcription parallèle
-        loop = asyncio.get_running_loop()
+            # 2. Pré-traitement audio
+            processed_path = await loop.run_in_executor(None, preprocess_audio, file_path)
         
-        if len(segment_paths) == 1:
-            results = [await loop.run_in_executor(
-                executor, transcribe_segment, segment_paths[0], translate
-            )]
-        else:
-            results = await asyncio.gather(*[
-                loop.run_in_executor(executor, transcribe_segment, seg, translate)
-                for seg in segment_paths
-            ])
-
-        # 5. Assemblage des résultats
-        full_text = ""
-        full_segments = []
-        language_detected = None
-        time_offset = 0.0
-
-        for text, segments_list, lang in results:
-            for seg in segments_list:
-                seg["start"] = round(seg["start"] + time_offset, 2)
-                seg["end"] = round(seg["end"] + time_offset, 2)
-                full_segments.append(seg)
-            
-            if segments_list:
-                time_offset = full_segments[-1]["end"]
+            # 3. Découpe intelligente (en mémoire, décodage unique)
+            audio_segments = await loop.run_in_executor(
+                None, split_audio_intelligent, processed_path, use_vad
+            )
+            offsets = [offset for _, offset in audio_segments]
+            logger.info(f"[{transcription_id}] 🔪 Created {len(audio_segments)} segments")
+
+            # 4. Transcription séquentielle sur le thread d'inférence dédié
+            results = await loop.run_in_executor(
+                executor, transcribe_all, audio_segments, translate
+            )
+            # Libère les échantillons décodés dès maintenant (pas de gc.collect() ici)
+            del audio_segments
+
+            # 5. Assemblage des résultats (horodatage relatif au début de chaque segment)
+            text_parts = []
+            full_segments = []
+            language_detected = None
+
+            for (text, segments_list, lang), time_offset in zip(results, offsets):
+                for seg in segments_list:
+                    seg["start"] = round(seg["start"] + time_offset, 2)
+                    seg["end"] = round(seg["end"] + time_offset, 2)
+                    full_segments.append(seg)
             
-            full_text += text + " "
-            if not language_detected:
-                language_detected = lang
-
-        processing_time = round(time.time() - start_time, 3)
-        speed_ratio = round(original_duration / processing_time, 2) if processing_time > 0 else 0
-
-        # 6. Mise à jour DB avec durée CORRECTE
-        entry.status = "done"
-        entry.language = language_detected
-        entry.processing_time = processing_time
-        entry.duration = original_duration  # ✅ FIX: Utiliser la durée originale
-        entry.text = full_text.strip()
-        entry.segments = json.dumps(full_segments)
-        entry.segments_count = len(full_segments)
-        entry.finished_at = datetime.utcnow()
-        db.commit()
-        
-        logger.info(
-            f"[{transcription_id}] ✅ Completed: {len(full_segments)} segments | "
-            f"Audio: {original_duration:.1f}s | Processing: {processing_time:.1f}s | "
-            f"Speed: {speed_ratio}x realtime | VAD: {use_vad}"
-        )
+                text_parts.append(text)
+                if not language_detected:
+                    language_detected = lang
 
-    except Exception as e:
-        logger.exception(f"[{transcription_id}] ❌ Error: {e}")
-        entry.status = "error"
-        entry.error_message = str(e)
-        entry.finished_at = datetime.utcnow()
-        db.commit()
+            processing_time = round(time.time() - start_time, 3)
+            speed_ratio = round(original_duration / processing_time, 2) if processing_time > 0 else 0
+
+            # 6. Mise à jour DB avec durée CORRECTE (un seul UPDATE)
+            db.execute(by_id.values(
+                status="done",
+                language=language_detected,
+                processing_time=processing_time,
+                duration=original_duration,  # ✅ FIX: Utiliser la durée originale
+                text=" ".join(text_parts).strip(),
+                segments=full_segments,
+                segments_count=len(full_segments),
+                finished_at=datetime.utcnow(),
+            ))
+            db.commit()
+        
+            logger.info(
+                f"[{transcription_id}] ✅ Completed: {len(full_segments)} segments | "
+                f"Audio: {original_duration:.1f}s | Processing: {processing_time:.1f}s | "
+                f"Speed: {speed_ratio}x realtime | VAD: {use_vad}"
+            )
+        
+            # 7. Enrichissement en fire-and-forget (ne bloque pas la transcription)
+            if ENRICHMENT_AUTO_TRIGGER and db.scalar(
+                select(Transcription.enrichment_requested).where(Transcription.id == transcription_id)
+            ):
+                from api.enrichment_client import trigger_enrichment_async
+                task = asyncio.create_task(trigger_enrichment_async(transcription_id))
+                _background_tasks.add(task)
+                task.add_done_callback(_background_tasks.discard)
 
-    finally:
-        db.close()
-        # Cleanup
-        try:
-            file_path.unlink(missing_ok=True)
-            if processed_path and processed_path != file_path:
-                processed_path.unlink(missing_ok=True)
-            for seg_path in segment_paths:
-                seg_path.unlink(missing_ok=True)
         except Exception as e:
-            logger.error(f"[{transcription_id}] Cleanup error: {e}")
\ No newline at end of file
+            logger.exception(f"[{transcription_id}] ❌ Error: {e}")
+            db.rollback()
+            db.execute(by_id.values(
+                status="error",
+                error_message=str(e),
+                finished_at=datetime.utcnow(),
+            ))
+            db.commit()
+
+        finally:
+            # Cleanup
+            try:
+                file_path.unlink(missing_ok=True)
+                if processed_path and processed_path != file_path:
+                    processed_path.unlink(missing_ok=True)
+            except Exception as e:
+                logger.error(f"[{transcription_id}] Cleanup error: {e}")
\ No newline at end of file